@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+import time
+
+from expense_batch import ExpenseBatch, from_epoch
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day, category)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_day ON rollups (day);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def summarize(expenses: list[dict] | ExpenseBatch, recent: int = 5) -> dict:
+    if isinstance(expenses, ExpenseBatch):
+        return _summarize_batch(expenses, recent)
+
+    total = 0
+    count = 0
+    min_price = None
+    max_price = None
+    categories = {}
+    for e in expenses:
+        price = e["price"]
+        total += price
+        count += 1
+        if min_price is None or price < min_price:
+            min_price = price
+        if max_price is None or price > max_price:
+            max_price = price
+        cat = e.get("category", "📦 Lainnya")
+        categories[cat] = categories.get(cat, 0) + price
+
+    return {
+        "total": total,
+        "count": count,
+        "average": total // count if count else 0,
+        "min": min_price,
+        "max": max_price,
+        "categories": dict(sorted(categories.items(), key=lambda x: x[1], reverse=True)),
+        "recent": expenses[-recent:] if recent else [],
+    }
+
+
+def _summarize_batch(batch: ExpenseBatch, recent: int) -> dict:
+    count = len(batch)
+    total, min_price, max_price, categories = batch.price_stats()
+    return {
+        "total": total,
+        "count": count,
+        "average": total // count if count else 0,
+        "min": min_price,
+        "max": max_price,
+        "categories": dict(sorted(categories.items(), key=lambda x: x[1], reverse=True)),
+        "recent": batch[-recent:] if recent else [],
+    }
+
+
+class CategoryRollups:
+
+    def __init__(self, path: str = None):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def needs_rebuild(self, interval: float) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'last_rebuild'").fetchone()
+            return time.time() - (row[0] if row else 0) >= interval
+
+    def invalidate(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM meta WHERE key = 'last_rebuild'")
+
+    def rebuild(self, expenses: ExpenseBatch):
+        days = {}
+        cells = {}
+        for ts, user_id, price, category in zip(
+            expenses.timestamps, expenses.user_ids, expenses.prices, expenses.categories(),
+        ):
+            day_number = ts // 86400
+            day = days.get(day_number)
+            if day is None:
+                day = days[day_number] = from_epoch(day_number * 86400).strftime("%Y-%m-%d")
+            key = (str(user_id), day, category)
+            total, count = cells.get(key, (0, 0))
+            cells[key] = (total + price, count + 1)
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rollups")
+            self._conn.executemany(
+                "INSERT INTO rollups VALUES (?, ?, ?, ?, ?)",
+                [key + value for key, value in cells.items()],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_rebuild', ?)",
+                (time.time(),),
+            )
+
+    def add(self, user_id, timestamp: str, category: str, price: int):
+        self._apply(user_id, timestamp, category, price, 1)
+
+    def remove(self, user_id, timestamp: str, category: str, price: int):
+        self._apply(user_id, timestamp, category, -price, -1)
+
+    def _apply(self, user_id, timestamp: str, category: str, price: int, count: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO rollups VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id, day, category) DO UPDATE SET "
+                "total = total + excluded.total, count = MAX(count + excluded.count, 0)",
+                (str(user_id), timestamp[:10], category, price, count),
+            )
+
+    def summarize(self, start_day: str, end_day: str, user_id: int = None) -> tuple[int, int, dict]:
+        sql = "SELECT category, SUM(total), SUM(count) FROM rollups WHERE day BETWEEN ? AND ?"
+        params = [start_day, end_day]
+        if user_id:
+            sql += " AND user_id = ?"
+            params.append(str(user_id))
+        sql += " GROUP BY category HAVING SUM(count) > 0 ORDER BY SUM(total) DESC"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        categories = {category: cat_total for category, cat_total, _ in rows}
+        return sum(categories.values()), sum(count for _, _, count in rows), categories
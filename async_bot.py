@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from telebot import asyncio_helper
+from telebot.async_telebot import AsyncTeleBot
+
+import config
+import metrics
+import sheets_helper
+from bot import (
+    HELP_TEXT, REPORT_PENDING_TEXT, report_cache, report_jobs,
+    delete_text, expense_text, format_summary, quarter_text, report_labels, start_text,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledSessionManager(asyncio_helper.SessionManager):
+
+    async def create_session(self):
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+            limit=config.TELEGRAM_POOL_SIZE,
+            keepalive_timeout=config.TELEGRAM_KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+            ssl=self.ssl_context,
+        ))
+        return self.session
+
+
+asyncio_helper.session_manager = _PooledSessionManager()
+
+bot = AsyncTeleBot(config.BOT_API_TOKEN, parse_mode="HTML")
+
+# gspread is blocking, so Sheets work runs here while the event loop keeps serving other chats.
+_sheets_pool = ThreadPoolExecutor(max_workers=config.ASYNC_SHEETS_WORKERS, thread_name_prefix="sheets")
+_background_tasks = set()
+
+
+async def _offload(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_sheets_pool, func, *args)
+
+
+def _log_background_failure(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.warning(f"Background Telegram call failed: {task.exception()}")
+
+
+def _fire(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_log_background_failure)
+
+
+def _chat_action(message, action: str = "typing"):
+    _fire(bot.send_chat_action(message.chat.id, action))
+
+
+async def process_update(update):
+    started = time.perf_counter()
+    await bot.process_new_updates([update])
+    metrics.update_seconds.observe(time.perf_counter() - started)
+
+
+@bot.message_handler(commands=["start"])
+@metrics.handler_seconds.timed()
+async def cmd_start(message):
+    await bot.reply_to(message, start_text(message.from_user.first_name or "kamu"))
+
+
+@bot.message_handler(commands=["help"])
+@metrics.handler_seconds.timed()
+async def cmd_help(message):
+    await bot.reply_to(message, HELP_TEXT)
+
+
+@bot.message_handler(commands=["today"])
+@metrics.handler_seconds.timed()
+async def cmd_today(message):
+    _chat_action(message)
+    summary = await _offload(sheets_helper.get_live_summary, "today", message.from_user.id)
+    await bot.reply_to(message, format_summary(summary, "Pengeluaran Hari Ini"))
+
+
+@bot.message_handler(commands=["week"])
+@metrics.handler_seconds.timed()
+async def cmd_week(message):
+    _chat_action(message)
+    summary = await _offload(sheets_helper.get_live_summary, "week", message.from_user.id)
+    await bot.reply_to(message, format_summary(summary, "Pengeluaran Minggu Ini"))
+
+
+@bot.message_handler(commands=["month"])
+@metrics.handler_seconds.timed()
+async def cmd_month(message):
+    _chat_action(message)
+    summary = await _offload(sheets_helper.get_live_summary, "month", message.from_user.id)
+    await bot.reply_to(message, format_summary(summary, "Pengeluaran Bulan Ini"))
+
+
+@bot.message_handler(commands=["year"])
+@metrics.handler_seconds.timed()
+async def cmd_year(message):
+    _chat_action(message)
+    summary = await _offload(sheets_helper.get_year_summary, message.from_user.id)
+    await bot.reply_to(message, format_summary(summary, "Pengeluaran Tahun Ini"))
+
+
+@bot.message_handler(commands=["q1", "q2", "q3", "q4"])
+@metrics.handler_seconds.timed()
+async def cmd_quarter(message):
+    _chat_action(message)
+    await bot.reply_to(message, await _offload(quarter_text, message))
+
+
+@bot.message_handler(commands=["report"])
+@metrics.handler_seconds.timed()
+async def cmd_report(message):
+    _chat_action(message)
+    user_id = message.from_user.id
+    user_name = message.from_user.first_name or "User"
+    summary = await _offload(sheets_helper.get_month_summary, user_id, 0)
+    period, period_label, caption, file_name = report_labels(user_name, summary)
+
+    if not summary["count"]:
+        await bot.reply_to(message, f"📭 Tidak ada data pengeluaran untuk <b>{period}</b>.")
+        return
+
+    _chat_action(message, "upload_document")
+    loop = asyncio.get_running_loop()
+
+    async def send_report(pdf_bytes):
+        await bot.send_document(
+            message.chat.id,
+            pdf_bytes,
+            caption=caption,
+            parse_mode="HTML",
+            reply_to_message_id=message.message_id,
+            visible_file_name=file_name,
+        )
+
+    async def report_failed(e):
+        await bot.reply_to(message, f"❌ Gagal membuat laporan: <code>{e}</code>")
+
+    try:
+        cache_key = (user_id, period_label, await _offload(sheets_helper.get_data_version, user_id))
+        pdf_bytes = report_cache.get(cache_key)
+        if pdf_bytes is not None:
+            await send_report(pdf_bytes)
+            return
+
+        job_key = (user_id, period_label)
+        if report_jobs and report_jobs.is_pending(job_key):
+            await bot.reply_to(message, REPORT_PENDING_TEXT)
+            return
+
+        expenses = await _offload(sheets_helper.get_month_expenses, user_id)
+
+        if report_jobs is None:
+            from report_generator import generate_report
+
+            started = time.perf_counter()
+            pdf_bytes = await _offload(generate_report, expenses, period_label)
+            metrics.report_render_seconds.observe(time.perf_counter() - started, "inline")
+            report_cache.put(cache_key, pdf_bytes)
+            await send_report(pdf_bytes)
+            return
+
+        # Report jobs call back on their delivery threads, so the sends are handed back to this loop.
+        def on_done(pdf_bytes):
+            report_cache.put(cache_key, pdf_bytes)
+            asyncio.run_coroutine_threadsafe(send_report(pdf_bytes), loop).result()
+
+        def on_error(e):
+            asyncio.run_coroutine_threadsafe(report_failed(e), loop).result()
+
+        if not report_jobs.submit(job_key, expenses, period_label, on_done, on_error):
+            await bot.reply_to(message, REPORT_PENDING_TEXT)
+
+    except Exception as e:
+        await report_failed(e)
+
+
+@bot.message_handler(commands=["delete"])
+@metrics.handler_seconds.timed()
+async def cmd_delete(message):
+    _chat_action(message)
+    await bot.reply_to(message, await _offload(delete_text, message.from_user.id))
+
+
+@bot.message_handler(func=lambda msg: msg.text and not msg.text.startswith("/"))
+@metrics.handler_seconds.timed()
+async def handle_expense(message):
+    _chat_action(message)
+    await bot.reply_to(message, await _offload(expense_text, message))
+
+
+if __name__ == "__main__":
+    sheets_helper.start_write_queue()
+    print("Bot berjalan dalam mode polling (async)...")
+    print("Tekan Ctrl+C untuk berhenti.\n")
+    asyncio.run(bot.infinity_polling(timeout=60, request_timeout=90))
@@ -0,0 +1,116 @@
+import os
+import sys
+import random
+import timeit
+from array import array
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregates import summarize
+from expense_batch import ExpenseBatch
+from parser import CATEGORIES
+
+
+class _CountingList(list):
+
+    passes = 0
+
+    def __iter__(self):
+        _CountingList.passes += 1
+        return super().__iter__()
+
+
+class _CountingArray(array):
+
+    def __iter__(self):
+        _CountingList.passes += 1
+        return super().__iter__()
+
+
+def _make_batch(expenses: list[dict]) -> ExpenseBatch:
+    batch = ExpenseBatch()
+    for e in expenses:
+        batch.append(
+            datetime.fromisoformat(e["timestamp"]), e["user_id"], e["user_name"],
+            e["price"], e["item"], e["description"], e["category"],
+        )
+    # Every aggregation has to read the prices, so each loop over that column counts as one pass.
+    batch.prices = _CountingArray(batch.prices.typecode, batch.prices)
+    return batch
+
+
+def _make_expenses(size: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    categories = list(CATEGORIES) + ["📦 Lainnya"]
+    return [
+        {
+            "timestamp": f"2026-10-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+            "user_id": str(rng.randint(1, 50)),
+            "user_name": "User",
+            "price": rng.randint(1, 500) * 1000,
+            "item": "item",
+            "description": "",
+            "category": rng.choice(categories),
+        }
+        for _ in range(size)
+    ]
+
+
+def _legacy_aggregation(expenses: list[dict]):
+    # format_summary
+    total = sum(e["price"] for e in expenses)
+    categories = {}
+    for e in expenses:
+        cat = e.get("category", "📦 Lainnya")
+        categories[cat] = categories.get(cat, 0) + e["price"]
+    sorted(categories.items(), key=lambda x: x[1], reverse=True)
+
+    # report_generator._add_summary_section
+    total = sum(e["price"] for e in expenses)
+    total // len(expenses) if expenses else 0
+
+    # report_generator._add_category_breakdown
+    categories = {}
+    for e in expenses:
+        cat = e.get("category", "Lainnya")
+        categories[cat] = categories.get(cat, 0) + e["price"]
+    sorted(categories.items(), key=lambda x: x[1], reverse=True)
+    total = sum(e["price"] for e in expenses)
+
+    # report_generator._add_expense_table footer
+    total = sum(e["price"] for e in expenses)
+
+    # cmd_report caption
+    total = sum(e["price"] for e in expenses)
+    return total
+
+
+def _shared_aggregation(expenses: list[dict] | ExpenseBatch):
+    return summarize(expenses)["total"]
+
+
+def main():
+    size = int(os.getenv("BENCH_EXPENSES", "100000"))
+    expenses = _CountingList(_make_expenses(size))
+    batch = _make_batch(expenses)
+
+    assert _legacy_aggregation(expenses) == _shared_aggregation(expenses) == _shared_aggregation(batch)
+    assert summarize(batch)["categories"] == summarize(expenses)["categories"]
+
+    print(f"{size} synthetic expenses")
+    cases = [
+        ("legacy", _legacy_aggregation, expenses),
+        ("single pass", _shared_aggregation, expenses),
+        ("ExpenseBatch", _shared_aggregation, batch),
+    ]
+    for name, func, data in cases:
+        _CountingList.passes = 0
+        func(data)
+        passes = _CountingList.passes
+        seconds = min(timeit.repeat(lambda: func(data), number=1, repeat=5))
+        print(f"  {name:>12}: {passes} passes, {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
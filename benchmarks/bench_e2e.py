@@ -0,0 +1,375 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import threading
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("BOT_API_TOKEN", "123456:e2e-benchmark")
+os.environ.setdefault("SPREADSHEET_ID", "e2e-benchmark")
+os.environ.setdefault("REPORT_WORKERS", "0")
+# The default 60/min token bucket would dominate every timing; raise it so the run measures the bot, not the limiter.
+os.environ.setdefault("SHEETS_READS_PER_MINUTE", "1000000")
+os.environ.setdefault("SHEETS_WRITES_PER_MINUTE", "1000000")
+
+_COMMANDS = {
+    "expense": "15000 nasi goreng",
+    "bulk": "15000 nasi goreng\n8rb kopi susu\n5000 parkir",
+    "today": "/today",
+    "month": "/month",
+    "year": "/year",
+    "delete": "/delete",
+    "report": "/report",
+}
+
+
+class _QuotaResponse:
+
+    status_code = 429
+    text = "Quota exceeded"
+
+    def json(self):
+        return {"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}}
+
+
+class FakeWorksheet:
+
+    def __init__(self, rows: list[list], latency: float, error_rate: float, rng: random.Random):
+        self.title = "Expenses"
+        self.id = 0
+        self.rows = rows
+        self.calls = Counter()
+        self._latency = latency
+        self._error_rate = error_rate
+        self._rng = rng
+        self._lock = threading.Lock()
+
+    def _call(self, name: str):
+        import gspread
+
+        with self._lock:
+            self.calls[name] += 1
+            failed = self._rng.random() < self._error_rate
+        time.sleep(self._latency)
+        if failed:
+            raise gspread.exceptions.APIError(_QuotaResponse())
+
+    def _block(self, a1_range: str) -> list[list]:
+        import gspread
+
+        start, _, end = a1_range.partition(":")
+        first_row, first_col = gspread.utils.a1_to_rowcol(start if start[-1].isdigit() else start + "1")
+        if end and end[-1].isdigit():
+            last_row, last_col = gspread.utils.a1_to_rowcol(end)
+        else:
+            last_row, last_col = len(self.rows), gspread.utils.a1_to_rowcol((end or start.rstrip("0123456789")) + "1")[1]
+        with self._lock:
+            block = [row[first_col - 1:last_col] for row in self.rows[first_row - 1:last_row]]
+        while block and not any(block[-1]):
+            block.pop()
+        return block
+
+    def row_values(self, row: int) -> list:
+        self._call("row_values")
+        with self._lock:
+            return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col: int) -> list:
+        self._call("col_values")
+        with self._lock:
+            values = [row[col - 1] if len(row) >= col else "" for row in self.rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def update(self, a1_range: str, values: list[list], **kwargs):
+        self._call("update")
+        with self._lock:
+            self.rows[0] = [str(v) for v in values[0]]
+
+    def format(self, *args, **kwargs):
+        self._call("format")
+
+    def append_rows(self, rows: list[list], **kwargs) -> dict:
+        self._call("append_rows")
+        with self._lock:
+            first_row = len(self.rows) + 1
+            self.rows.extend([str(v) for v in row] for row in rows)
+            last_row = len(self.rows)
+        return {"updates": {"updatedRange": f"Expenses!A{first_row}:G{last_row}", "updatedRows": len(rows)}}
+
+    def get_all_values(self, **kwargs) -> list[list]:
+        self._call("get_all_values")
+        with self._lock:
+            return [list(row) for row in self.rows]
+
+    def get(self, a1_range: str, **kwargs) -> list[list]:
+        self._call("get")
+        return self._block(a1_range)
+
+    def batch_get(self, ranges: list[str], **kwargs) -> list[list[list]]:
+        self._call("batch_get")
+        return [self._block(r) for r in ranges]
+
+    def delete_rows(self, start: int, end: int = None):
+        self._call("delete_rows")
+        with self._lock:
+            del self.rows[start - 1:end or start]
+
+
+class FakeClient:
+
+    def __init__(self, worksheet: FakeWorksheet):
+        self._worksheet = worksheet
+
+    def open_by_key(self, key: str):
+        self._worksheet._call("open_by_key")
+        return self
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self._worksheet._call("worksheet")
+        return self._worksheet
+
+
+class _FakeTelegramResponse:
+
+    status_code = 200
+
+    def __init__(self, payload: dict):
+        self._payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self._payload
+
+
+class FakeTelegram:
+
+    def __init__(self, latency: float, error_rate: float, rng: random.Random):
+        self._latency = latency
+        self._error_rate = error_rate
+        self._rng = rng
+        self._lock = threading.Lock()
+        self._on_reply = None
+        self.calls = Counter()
+
+    def __call__(self, method: str, url: str, params: dict = None, files: dict = None, **kwargs):
+        method_name = url.rsplit("/", 1)[-1]
+        params = params or {}
+        with self._lock:
+            self.calls[method_name] += 1
+            failed = self._rng.random() < self._error_rate
+        time.sleep(self._latency)
+        if failed:
+            return _FakeTelegramResponse({"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1"})
+
+        if "reply_parameters" in params and self._on_reply:
+            reply_to = json.loads(params["reply_parameters"])["message_id"]
+            self._on_reply(reply_to, params.get("text") or params.get("caption") or "")
+
+        if method_name == "sendChatAction":
+            return _FakeTelegramResponse({"ok": True, "result": True})
+        chat_id = int(params.get("chat_id", 0))
+        return _FakeTelegramResponse({"ok": True, "result": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text", ""),
+        }})
+
+
+class _Tracker:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = {}
+        self._outcomes = {}
+
+    def start(self, message_id: int):
+        with self._lock:
+            self._events[message_id] = threading.Event()
+
+    def finish(self, message_id: int, ok: bool):
+        with self._lock:
+            event = self._events.get(message_id)
+            if event is None or event.is_set():
+                return
+            self._outcomes[message_id] = ok
+            event.set()
+
+    def wait(self, message_id: int, timeout: float) -> bool:
+        finished = self._events[message_id].wait(timeout)
+        with self._lock:
+            return finished and self._outcomes.get(message_id, False)
+
+
+def _make_rows(size: int, users: list[int], rng: random.Random) -> list[list]:
+    rows = [["Timestamp", "User ID", "User", "Harga", "Item", "Deskripsi", "Kategori"]]
+    end = datetime.now().replace(microsecond=0) - timedelta(minutes=1)
+    span = 365 * 86400
+    for i in range(size):
+        user_id = users[i % len(users)]
+        timestamp = end - timedelta(seconds=span * (size - i) // max(size, 1))
+        rows.append([
+            timestamp.strftime("%Y-%m-%d %H:%M:%S"), str(user_id), f"User{user_id}",
+            str(rng.randint(1, 500) * 1000), "makan siang", "", "🍔 Makanan",
+        ])
+    return rows
+
+
+def _update(update_id: int, user_id: int, text: str) -> str:
+    return json.dumps({"update_id": update_id, "message": {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+        "text": text,
+    }})
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def main():
+    sizes = [int(s) for s in os.getenv("BENCH_SIZES", "1000,10000,50000").split(",")]
+    concurrency_levels = [int(c) for c in os.getenv("BENCH_CONCURRENCY", "1,4,16").split(",")]
+    commands = os.getenv("BENCH_COMMANDS", ",".join(_COMMANDS)).split(",")
+    updates_per_client = int(os.getenv("BENCH_UPDATES", "5"))
+    sheets_latency = float(os.getenv("SHEETS_LATENCY_MS", "20")) / 1000
+    sheets_error_rate = float(os.getenv("SHEETS_QUOTA_ERROR_RATE", "0"))
+    telegram_latency = float(os.getenv("TELEGRAM_LATENCY_MS", "10")) / 1000
+    telegram_error_rate = float(os.getenv("TELEGRAM_ERROR_RATE", "0"))
+    timeout = float(os.getenv("BENCH_TIMEOUT", "30"))
+    output = os.getenv("BENCH_OUTPUT", "bench_e2e.json")
+    rng = random.Random(int(os.getenv("BENCH_SEED", "42")))
+
+    import telebot
+
+    import flask_app
+    import sheets_helper
+    import bot as bot_module
+    from aggregates import CategoryRollups
+    from report_cache import ReportCache
+
+    logging.disable(logging.ERROR)
+
+    telegram = FakeTelegram(telegram_latency, telegram_error_rate, rng)
+    telebot.apihelper.CUSTOM_REQUEST_SENDER = telegram
+    tracker = _Tracker()
+    telegram._on_reply = lambda message_id, text: tracker.finish(message_id, not text.startswith("❌"))
+
+    current = threading.local()
+
+    class _TrackingExceptionHandler(telebot.ExceptionHandler):
+        def handle(self, exception):
+            tracker.finish(getattr(current, "message_id", None), False)
+            return True
+
+    bot_module.bot.exception_handler = _TrackingExceptionHandler()
+    process_update = flask_app._process_update
+
+    def _tracked(update):
+        current.message_id = update.message.message_id
+        process_update(update)
+
+    if flask_app.dispatcher:
+        flask_app.dispatcher._process_func = _tracked
+    else:
+        flask_app._process_update = _tracked
+
+    client = flask_app.app.test_client()
+    update_ids = iter(range(1, 10 ** 9))
+    results = []
+
+    for size in sizes:
+        for concurrency in concurrency_levels:
+            users = [10_000 + i for i in range(concurrency)]
+            for command in commands:
+                worksheet = FakeWorksheet(_make_rows(size, users, rng), sheets_latency, 0, rng)
+                sheets_helper._client = FakeClient(worksheet)
+                sheets_helper.invalidate_sheet_cache()
+                sheets_helper._rollups = CategoryRollups()
+                bot_module.report_cache = ReportCache(bot_module.config.REPORT_CACHE_MAX_BYTES)
+                # Warm the worksheet handle and rollups so every scenario measures steady state.
+                sheets_helper.get_data_version(users[0])
+                worksheet._error_rate = sheets_error_rate
+                worksheet.calls.clear()
+                telegram.calls.clear()
+
+                latencies = []
+                failures = Counter()
+                rejected = Counter()
+
+                def _client_loop(user_id: int):
+                    for _ in range(updates_per_client):
+                        update_id = next(update_ids)
+                        tracker.start(update_id)
+                        started = time.perf_counter()
+                        body = _update(update_id, user_id, _COMMANDS[command])
+                        while client.post("/webhook", data=body, content_type="application/json").status_code == 503:
+                            rejected[user_id] += 1
+                            time.sleep(0.05)
+                        if tracker.wait(update_id, timeout):
+                            latencies.append(time.perf_counter() - started)
+                        else:
+                            failures[user_id] += 1
+
+                wall_started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(_client_loop, users))
+                wall = time.perf_counter() - wall_started
+
+                total_updates = concurrency * updates_per_client
+                result = {
+                    "command": command,
+                    "sheet_rows": size,
+                    "concurrency": concurrency,
+                    "updates": total_updates,
+                    "failed": sum(failures.values()),
+                    "rejected_503": sum(rejected.values()),
+                    "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+                    "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+                    "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+                    "throughput_per_s": round(total_updates / wall, 2),
+                    "sheets_calls_per_update": round(sum(worksheet.calls.values()) / total_updates, 2),
+                    "sheets_calls": dict(worksheet.calls),
+                    "telegram_calls": dict(telegram.calls),
+                }
+                results.append(result)
+                print(
+                    f"{command:>8} rows={size:<7} c={concurrency:<3} p50={result['p50_ms']:>8.1f} ms "
+                    f"p99={result['p99_ms']:>8.1f} ms  {result['throughput_per_s']:>7.2f} upd/s  "
+                    f"{result['sheets_calls_per_update']:>5.2f} calls/upd  failed={result['failed']}"
+                )
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "config": {
+                "sheets_latency_ms": sheets_latency * 1000,
+                "sheets_quota_error_rate": sheets_error_rate,
+                "telegram_latency_ms": telegram_latency * 1000,
+                "telegram_error_rate": telegram_error_rate,
+                "updates_per_client": updates_per_client,
+                "webhook_workers": bot_module.config.WEBHOOK_WORKERS,
+                "report_workers": bot_module.config.REPORT_WORKERS,
+                "storage_backend": bot_module.config.STORAGE_BACKEND,
+            },
+            "results": results,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parser
+from parser import CATEGORIES
+
+
+def _legacy_detect_category(text: str) -> str:
+    text_lower = text.lower()
+    for category, keywords in CATEGORIES.items():
+        for keyword in keywords:
+            if keyword in text_lower:
+                return category
+    return "📦 Lainnya"
+
+
+def _make_corpus(size: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    keywords = [k for kws in CATEGORIES.values() for k in kws]
+    filler = ["enak", "banget", "sama", "teman", "di", "dekat", "kantor", "promo", "xyz", "Beli", "PAGI"]
+    corpus = []
+    for _ in range(size):
+        words = rng.choices(filler, k=rng.randint(1, 6))
+        for _ in range(rng.randint(0, 3)):
+            word = rng.choice(keywords)
+            if rng.random() < 0.3:
+                word = word.upper()
+            if rng.random() < 0.3:
+                word = rng.choice(filler) + word + rng.choice(filler)
+            words.insert(rng.randint(0, len(words)), word)
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def _run(label: str, corpus_size: int):
+    corpus = _make_corpus(corpus_size)
+    keyword_count = sum(len(kws) for kws in CATEGORIES.values())
+
+    mismatches = [t for t in corpus if parser._detect_category(t) != _legacy_detect_category(t)]
+    assert not mismatches, f"{len(mismatches)} mismatches, e.g. {mismatches[:3]}"
+    print(f"[{label}, {keyword_count} keywords] {len(corpus)} generated texts, 0 mismatches")
+
+    sample = corpus[:5000]
+    for name, func in [("legacy scan", _legacy_detect_category), ("compiled matcher", parser._detect_category)]:
+        seconds = min(timeit.repeat(lambda: [func(t) for t in sample], number=1, repeat=5))
+        print(f"  {name:>17}: {seconds / len(sample) * 1e6:.2f} µs/message")
+
+
+def main():
+    corpus_size = int(os.getenv("BENCH_CORPUS_SIZE", "50000"))
+    _run("current table", corpus_size)
+
+    rng = random.Random(7)
+    for category in list(CATEGORIES):
+        CATEGORIES[category] = CATEGORIES[category] + [
+            "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9))) for _ in range(100)
+        ]
+    _run("extended table", corpus_size)
+
+
+if __name__ == "__main__":
+    main()
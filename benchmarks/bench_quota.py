@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_e2e import FakeWorksheet, _make_rows
+from sheets_client import QuotaAwareClient, TokenBucket
+
+
+def _burst(call, worksheet: FakeWorksheet, concurrency: int, func_name: str) -> tuple[int, int]:
+    barrier = threading.Barrier(concurrency)
+
+    def _one(_):
+        barrier.wait()
+        try:
+            call(getattr(worksheet, func_name))
+            return True
+        except Exception:
+            return False
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        succeeded = sum(pool.map(_one, range(concurrency)))
+    return succeeded, sum(worksheet.calls.values())
+
+
+def main():
+    rng = random.Random(42)
+    concurrency = int(os.getenv("BENCH_CONCURRENCY", "32"))
+    error_rate = float(os.getenv("SHEETS_QUOTA_ERROR_RATE", "0.3"))
+    latency = float(os.getenv("SHEETS_LATENCY_MS", "50")) / 1000
+    rows = _make_rows(int(os.getenv("BENCH_ROWS", "5000")), [1, 2, 3], rng)
+
+    client = QuotaAwareClient(6000, 6000, max_retries=8, backoff_base=0.01, backoff_max=0.2)
+
+    print(f"{concurrency} concurrent get_all_values, {error_rate:.0%} injected 429s, {latency * 1000:.0f} ms per call")
+    for name, call in [("raw", lambda func: func()), ("quota-aware", client.call)]:
+        worksheet = FakeWorksheet([list(r) for r in rows], latency, error_rate, rng)
+        started = time.perf_counter()
+        succeeded, api_calls = _burst(call, worksheet, concurrency, "get_all_values")
+        elapsed = time.perf_counter() - started
+        print(f"  {name:>11}: {succeeded}/{concurrency} succeeded, {api_calls} API calls, {elapsed * 1000:.0f} ms")
+        if name == "quota-aware":
+            # Every caller must get through the injected 429s, and the identical reads must share in-flight calls.
+            assert succeeded == concurrency
+            assert api_calls < concurrency
+
+    worksheet = FakeWorksheet([list(r) for r in rows], latency, error_rate, rng)
+
+    def _append_then_read(i: int) -> bool:
+        marker = f"writer-{i}"
+        client.call(worksheet.append_rows, [["2026-01-01 00:00:00", "9", "W", "1", marker, "", "c"]])
+        return marker in [row[4] for row in client.call(worksheet.get_all_values)]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        seen = sum(pool.map(_append_then_read, range(concurrency)))
+    print(f"  read-your-writes: {seen}/{concurrency} writers saw their own row")
+    assert seen == concurrency
+
+    per_minute = 600
+    bucket = TokenBucket(per_minute)
+    extra = 20
+    started = time.perf_counter()
+    for _ in range(per_minute + extra):
+        bucket.acquire()
+    elapsed = time.perf_counter() - started
+    print(f"  token bucket: {per_minute} burst + {extra} paced calls took {elapsed:.2f}s (expected ~{extra / (per_minute / 60):.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
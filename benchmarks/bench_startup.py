@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_FIRST_REQUEST = """
+import json
+import time
+started = time.perf_counter()
+import flask_app
+imported = time.perf_counter()
+response = flask_app.app.test_client().get("/")
+assert response.status_code == 200
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_request_ms": (time.perf_counter() - started) * 1000}))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("BOT_API_TOKEN", "123456:startup-benchmark")
+    env.setdefault("SPREADSHEET_ID", "startup-benchmark")
+    return env
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+
+
+def _slowest_imports(top: int) -> list[tuple[int, str]]:
+    modules = []
+    for line in _run("-X", "importtime", "-c", "import flask_app").stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.append((int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main():
+    runs = int(os.getenv("BENCH_RUNS", "5"))
+    budget_ms = float(os.getenv("STARTUP_BUDGET_MS", "1000"))
+
+    print("slowest imports (cumulative):")
+    for cumulative, name in _slowest_imports(int(os.getenv("BENCH_TOP", "10"))):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    samples = [json.loads(_run("-c", _FIRST_REQUEST).stdout.splitlines()[-1]) for _ in range(runs)]
+    import_ms = min(s["import_ms"] for s in samples)
+    first_request_ms = min(s["first_request_ms"] for s in samples)
+    print(f"import flask_app: {import_ms:.1f} ms, time to first request: {first_request_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+
+    if first_request_ms > budget_ms:
+        print("startup regression: time to first request is over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
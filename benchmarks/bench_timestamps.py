@@ -0,0 +1,73 @@
+import os
+import sys
+import random
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expense_batch import ExpenseBatch, filter_rows
+
+_MALFORMED = [
+    "2026-10-5 9:07:00",
+    "2026-10- 5 09:07:00",
+    "2026-13-01 00:00:00",
+    "2026-02-30 12:00:00",
+    "10/05/2026 09:07",
+    "",
+    "2026-10-05T09:07:00",
+]
+
+
+def _make_rows(size: int, seed: int = 42) -> list[list]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    span = int((datetime(2026, 12, 31) - start).total_seconds())
+    rows = []
+    for i in range(size):
+        if i % 1000 == 0:
+            ts = rng.choice(_MALFORMED)
+        else:
+            ts = (start + timedelta(seconds=span * i // size)).strftime("%Y-%m-%d %H:%M:%S")
+        rows.append([ts, str(rng.randint(1, 50)), "User", str(rng.randint(1, 500) * 1000), "item", "", "🍔 Makanan"])
+    return rows
+
+
+def _legacy_filter(rows: list[list], start_date: datetime, end_date: datetime, user_id: int = None) -> ExpenseBatch:
+    expenses = ExpenseBatch()
+    for row in rows:
+        if len(row) < 7:
+            continue
+        try:
+            row_date = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S")
+            if start_date <= row_date <= end_date:
+                if user_id and row[1] != str(user_id):
+                    continue
+                price = int(float(row[3])) if row[3] else 0
+                expenses.append(row_date, row[1], row[2], price, row[4], row[5], row[6])
+        except (ValueError, IndexError, OverflowError):
+            continue
+
+    return expenses
+
+
+def main():
+    sizes = [int(s) for s in os.getenv("BENCH_ROWS", "10000,100000,1000000").split(",")]
+    ranges = [
+        ("month", datetime(2026, 10, 1), datetime(2026, 10, 31, 23, 59, 59, 999999), None),
+        ("week/user", datetime(2026, 10, 5, 0, 0, 0, 500000), datetime(2026, 10, 11, 23, 59, 59), 7),
+        ("all", datetime.min, datetime.max, None),
+    ]
+
+    for size in sizes:
+        rows = _make_rows(size)
+        print(f"{size} rows")
+        for name, start, end, user_id in ranges:
+            assert _legacy_filter(rows, start, end, user_id) == filter_rows(rows, start, end, user_id)
+            legacy = min(timeit.repeat(lambda: _legacy_filter(rows, start, end, user_id), number=1, repeat=3))
+            fast = min(timeit.repeat(lambda: filter_rows(rows, start, end, user_id), number=1, repeat=3))
+            print(f"  {name:>9}: legacy {legacy * 1000:8.1f} ms, string bounds {fast * 1000:8.1f} ms ({legacy / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
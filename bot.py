@@ -1,18 +1,24 @@
-import os
+import html
+import time
+from datetime import datetime
+
 import telebot
 
 import config
-from parser import parse_expense, format_rupiah
+import metrics
+from parser import parse_expense, parse_many, format_rupiah
 import sheets_helper
-from report_generator import generate_report
+from report_cache import ReportCache
+from report_jobs import ReportJobQueue
 
 bot = telebot.TeleBot(config.BOT_API_TOKEN, parse_mode="HTML")
 
+report_cache = ReportCache(config.REPORT_CACHE_MAX_BYTES)
+report_jobs = ReportJobQueue(config.REPORT_WORKERS) if config.REPORT_WORKERS > 0 else None
 
-@bot.message_handler(commands=["start"])
-def cmd_start(message):
-    name = message.from_user.first_name or "kamu"
-    text = (
+
+def start_text(name: str) -> str:
+    return (
         f"👋 <b>Halo, {name}!</b>\n\n"
         f"Saya adalah <b>💰 Expense Tracker Bot</b> — asisten pencatat pengeluaranmu.\n\n"
         f"📝 <b>Cara pakai:</b>\n"
@@ -30,77 +36,79 @@ def cmd_start(message):
         f"🗑 /delete — Hapus entri terakhir\n"
         f"❓ /help — Panduan lengkap"
     )
-    bot.reply_to(message, text)
+
+
+HELP_TEXT = (
+    "📖 <b>Panduan Lengkap</b>\n\n"
+    "━━━ <b>📝 Cara Catat Pengeluaran</b> ━━━\n"
+    "Kirim pesan dengan format:\n"
+    "<code>[harga] [nama item] - [deskripsi]</code>\n\n"
+    "<b>Shorthand harga:</b>\n"
+    "• <code>k</code> atau <code>rb</code> = ribu (×1.000)\n"
+    "• <code>jt</code> = juta (×1.000.000)\n"
+    "• Desimal OK: <code>2.5jt</code>, <code>1,5k</code>\n\n"
+    "<b>Contoh:</b>\n"
+    "• <code>25k naspad rendang - tambah telur</code>\n"
+    "  → Rp 25.000 | naspad rendang | tambah telur\n"
+    "• <code>150rb sepatu nike</code>\n"
+    "  → Rp 150.000 | sepatu nike\n"
+    "• <code>2.5jt laptop bekas</code>\n"
+    "  → Rp 2.500.000 | laptop bekas\n\n"
+    "<b>Separator deskripsi:</b> <code> - </code> atau <code>, </code>\n\n"
+    "<b>Banyak sekaligus:</b> tulis satu pengeluaran per baris dalam satu pesan.\n\n"
+    "━━━ <b>📋 Daftar Command</b> ━━━\n\n"
+    "<b>📊 Ringkasan:</b>\n"
+    "/today — Pengeluaran hari ini\n"
+    "/week — Pengeluaran minggu ini\n"
+    "/month — Pengeluaran bulan ini\n"
+    "/year — Pengeluaran tahun ini\n"
+    "/q1 — Kuartal 1 (Jan-Mar)\n"
+    "/q2 — Kuartal 2 (Apr-Jun)\n"
+    "/q3 — Kuartal 3 (Jul-Sep)\n"
+    "/q4 — Kuartal 4 (Okt-Des)\n\n"
+    "<b>📄 Laporan:</b>\n"
+    "/report — Download laporan PDF bulan ini\n\n"
+    "<b>🛠 Lainnya:</b>\n"
+    "/delete — Hapus entri terakhir\n"
+    "/help — Tampilkan panduan ini\n\n"
+    "━━━ <b>🏷 Kategori Otomatis</b> ━━━\n"
+    "🍔 Makanan · ☕ Minuman · 🚗 Transportasi\n"
+    "🛒 Belanja · 🏥 Kesehatan · 🎮 Hiburan\n"
+    "💡 Utilitas · 📦 Lainnya"
+)
+
+
+@bot.message_handler(commands=["start"])
+@metrics.handler_seconds.timed()
+def cmd_start(message):
+    bot.reply_to(message, start_text(message.from_user.first_name or "kamu"))
 
 
 @bot.message_handler(commands=["help"])
+@metrics.handler_seconds.timed()
 def cmd_help(message):
-    text = (
-        "📖 <b>Panduan Lengkap</b>\n\n"
-        "━━━ <b>📝 Cara Catat Pengeluaran</b> ━━━\n"
-        "Kirim pesan dengan format:\n"
-        "<code>[harga] [nama item] - [deskripsi]</code>\n\n"
-        "<b>Shorthand harga:</b>\n"
-        "• <code>k</code> atau <code>rb</code> = ribu (×1.000)\n"
-        "• <code>jt</code> = juta (×1.000.000)\n"
-        "• Desimal OK: <code>2.5jt</code>, <code>1,5k</code>\n\n"
-        "<b>Contoh:</b>\n"
-        "• <code>25k naspad rendang - tambah telur</code>\n"
-        "  → Rp 25.000 | naspad rendang | tambah telur\n"
-        "• <code>150rb sepatu nike</code>\n"
-        "  → Rp 150.000 | sepatu nike\n"
-        "• <code>2.5jt laptop bekas</code>\n"
-        "  → Rp 2.500.000 | laptop bekas\n\n"
-        "<b>Separator deskripsi:</b> <code> - </code> atau <code>, </code>\n\n"
-        "━━━ <b>📋 Daftar Command</b> ━━━\n\n"
-        "<b>📊 Ringkasan:</b>\n"
-        "/today — Pengeluaran hari ini\n"
-        "/week — Pengeluaran minggu ini\n"
-        "/month — Pengeluaran bulan ini\n"
-        "/year — Pengeluaran tahun ini\n"
-        "/q1 — Kuartal 1 (Jan-Mar)\n"
-        "/q2 — Kuartal 2 (Apr-Jun)\n"
-        "/q3 — Kuartal 3 (Jul-Sep)\n"
-        "/q4 — Kuartal 4 (Okt-Des)\n\n"
-        "<b>📄 Laporan:</b>\n"
-        "/report — Download laporan PDF bulan ini\n\n"
-        "<b>🛠 Lainnya:</b>\n"
-        "/delete — Hapus entri terakhir\n"
-        "/help — Tampilkan panduan ini\n\n"
-        "━━━ <b>🏷 Kategori Otomatis</b> ━━━\n"
-        "🍔 Makanan · ☕ Minuman · 🚗 Transportasi\n"
-        "🛒 Belanja · 🏥 Kesehatan · 🎮 Hiburan\n"
-        "💡 Utilitas · 📦 Lainnya"
-    )
-    bot.reply_to(message, text)
+    bot.reply_to(message, HELP_TEXT)
 
 
-def _format_summary(expenses: list[dict], title: str) -> str:
-    if not expenses:
+def format_summary(summary: dict, title: str) -> str:
+    if not summary["count"]:
         return f"📭 <b>{title}</b>\n\nBelum ada pengeluaran tercatat."
 
-    total = sum(e["price"] for e in expenses)
-
-    categories = {}
-    for e in expenses:
-        cat = e.get("category", "📦 Lainnya")
-        categories[cat] = categories.get(cat, 0) + e["price"]
-
-    sorted_cats = sorted(categories.items(), key=lambda x: x[1], reverse=True)
+    total = summary["total"]
 
     lines = [
         f"📊 <b>{title}</b>\n",
         f"💳 Total: <b>{format_rupiah(total)}</b>",
-        f"📝 Transaksi: <b>{len(expenses)}</b>\n",
+        f"📝 Transaksi: <b>{summary['count']}</b>\n",
         "─── Per Kategori ───",
     ]
 
-    for cat_name, cat_total in sorted_cats:
+    for cat_name, cat_total in summary["categories"].items():
         pct = (cat_total / total * 100) if total > 0 else 0
         lines.append(f"  {cat_name}: {format_rupiah(cat_total)} ({pct:.0f}%)")
 
     lines.append("\n─── Transaksi Terbaru ───")
-    recent = expenses[-5:]
+    recent = summary["recent"]
     for e in reversed(recent):
         desc = f" <i>({e['description']})</i>" if e.get("description") else ""
         try:
@@ -109,139 +117,220 @@ def _format_summary(expenses: list[dict], title: str) -> str:
             ts = ""
         lines.append(f"  • {format_rupiah(e['price'])} — {e['item']}{desc} [{ts}]")
 
-    if len(expenses) > 5:
-        lines.append(f"  <i>...dan {len(expenses) - 5} transaksi lainnya</i>")
+    if summary["count"] > len(recent):
+        lines.append(f"  <i>...dan {summary['count'] - len(recent)} transaksi lainnya</i>")
 
     return "\n".join(lines)
 
 
 @bot.message_handler(commands=["today"])
+@metrics.handler_seconds.timed()
 def cmd_today(message):
     bot.send_chat_action(message.chat.id, "typing")
     user_id = message.from_user.id
-    expenses = sheets_helper.get_today_expenses(user_id)
-    text = _format_summary(expenses, "Pengeluaran Hari Ini")
+    summary = sheets_helper.get_live_summary("today", user_id)
+    text = format_summary(summary, "Pengeluaran Hari Ini")
     bot.reply_to(message, text)
 
 
 @bot.message_handler(commands=["week"])
+@metrics.handler_seconds.timed()
 def cmd_week(message):
     bot.send_chat_action(message.chat.id, "typing")
     user_id = message.from_user.id
-    expenses = sheets_helper.get_week_expenses(user_id)
-    text = _format_summary(expenses, "Pengeluaran Minggu Ini")
+    summary = sheets_helper.get_live_summary("week", user_id)
+    text = format_summary(summary, "Pengeluaran Minggu Ini")
     bot.reply_to(message, text)
 
 
 @bot.message_handler(commands=["month"])
+@metrics.handler_seconds.timed()
 def cmd_month(message):
     bot.send_chat_action(message.chat.id, "typing")
     user_id = message.from_user.id
-    expenses = sheets_helper.get_month_expenses(user_id)
-    text = _format_summary(expenses, "Pengeluaran Bulan Ini")
+    summary = sheets_helper.get_live_summary("month", user_id)
+    text = format_summary(summary, "Pengeluaran Bulan Ini")
     bot.reply_to(message, text)
 
 
 @bot.message_handler(commands=["year"])
+@metrics.handler_seconds.timed()
 def cmd_year(message):
     bot.send_chat_action(message.chat.id, "typing")
     user_id = message.from_user.id
-    expenses = sheets_helper.get_year_expenses(user_id)
-    text = _format_summary(expenses, "Pengeluaran Tahun Ini")
+    summary = sheets_helper.get_year_summary(user_id)
+    text = format_summary(summary, "Pengeluaran Tahun Ini")
     bot.reply_to(message, text)
 
 
-@bot.message_handler(commands=["q1", "q2", "q3", "q4"])
-def cmd_quarter(message):
-    bot.send_chat_action(message.chat.id, "typing")
+def quarter_text(message) -> str:
     user_id = message.from_user.id
     quarter_num = int(message.text.strip("/qQ"))
     quarter_labels = {1: "Q1 (Jan-Mar)", 2: "Q2 (Apr-Jun)", 3: "Q3 (Jul-Sep)", 4: "Q4 (Okt-Des)"}
-    expenses = sheets_helper.get_quarter_expenses(quarter_num, user_id)
+    summary = sheets_helper.get_quarter_summary(quarter_num, user_id)
     label = quarter_labels.get(quarter_num, f"Q{quarter_num}")
-    text = _format_summary(expenses, f"Pengeluaran {label}")
-    bot.reply_to(message, text)
+    return format_summary(summary, f"Pengeluaran {label}")
+
+
+@bot.message_handler(commands=["q1", "q2", "q3", "q4"])
+@metrics.handler_seconds.timed()
+def cmd_quarter(message):
+    bot.send_chat_action(message.chat.id, "typing")
+    bot.reply_to(message, quarter_text(message))
+
+
+REPORT_PENDING_TEXT = "⏳ Laporanmu sedang dibuat, tunggu sebentar ya."
+
+
+def report_labels(user_name: str, summary: dict) -> tuple[str, str, str, str]:
+    now = datetime.now()
+    period = now.strftime("%B %Y")
+    period_label = f"Periode: {period} — {user_name}"
+    caption = (
+        f"📄 <b>Laporan Pengeluaran — {period}</b>\n"
+        f"👤 {user_name}\n"
+        f"💳 Total: <b>{format_rupiah(summary['total'])}</b> ({summary['count']} transaksi)"
+    )
+    file_name = f"Laporan_{user_name}_{now.strftime('%Y_%m')}.pdf"
+    return period, period_label, caption, file_name
 
 
 @bot.message_handler(commands=["report"])
+@metrics.handler_seconds.timed()
 def cmd_report(message):
     bot.send_chat_action(message.chat.id, "typing")
     user_id = message.from_user.id
     user_name = message.from_user.first_name or "User"
-    expenses = sheets_helper.get_month_expenses(user_id)
+    summary = sheets_helper.get_month_summary(user_id, recent=0)
+    period, period_label, caption, file_name = report_labels(user_name, summary)
 
-    from datetime import datetime
-    now = datetime.now()
-    period = now.strftime("%B %Y")
-
-    if not expenses:
+    if not summary["count"]:
         bot.reply_to(message, f"📭 Tidak ada data pengeluaran untuk <b>{period}</b>.")
         return
 
     bot.send_chat_action(message.chat.id, "upload_document")
 
+    def send_report(pdf_bytes):
+        bot.send_document(
+            message.chat.id,
+            pdf_bytes,
+            caption=caption,
+            parse_mode="HTML",
+            reply_to_message_id=message.message_id,
+            visible_file_name=file_name,
+        )
+
+    def report_failed(e):
+        bot.reply_to(message, f"❌ Gagal membuat laporan: <code>{e}</code>")
+
     try:
-        filepath = generate_report(expenses, f"Periode: {period} — {user_name}")
-        total = sum(e["price"] for e in expenses)
+        cache_key = (user_id, period_label, sheets_helper.get_data_version(user_id))
+        pdf_bytes = report_cache.get(cache_key)
+        if pdf_bytes is not None:
+            send_report(pdf_bytes)
+            return
 
-        caption = (
-            f"📄 <b>Laporan Pengeluaran — {period}</b>\n"
-            f"👤 {user_name}\n"
-            f"💳 Total: <b>{format_rupiah(total)}</b> ({len(expenses)} transaksi)"
-        )
+        job_key = (user_id, period_label)
+        if report_jobs and report_jobs.is_pending(job_key):
+            bot.reply_to(message, REPORT_PENDING_TEXT)
+            return
 
-        with open(filepath, "rb") as f:
-            bot.send_document(
-                message.chat.id,
-                f,
-                caption=caption,
-                parse_mode="HTML",
-                reply_to_message_id=message.message_id,
-                visible_file_name=f"Laporan_{user_name}_{now.strftime('%Y_%m')}.pdf",
-            )
+        expenses = sheets_helper.get_month_expenses(user_id)
 
-        os.remove(filepath)
+        if report_jobs is None:
+            # fpdf is slow to import, so the PDF stack loads on the first inline report.
+            from report_generator import generate_report
 
-    except Exception as e:
-        bot.reply_to(message, f"❌ Gagal membuat laporan: <code>{e}</code>")
+            started = time.perf_counter()
+            pdf_bytes = generate_report(expenses, period_label)
+            metrics.report_render_seconds.observe(time.perf_counter() - started, "inline")
+            report_cache.put(cache_key, pdf_bytes)
+            send_report(pdf_bytes)
+            return
 
+        def on_done(pdf_bytes):
+            report_cache.put(cache_key, pdf_bytes)
+            send_report(pdf_bytes)
 
-@bot.message_handler(commands=["delete"])
-def cmd_delete(message):
-    bot.send_chat_action(message.chat.id, "typing")
-    user_id = message.from_user.id
+        if not report_jobs.submit(job_key, expenses, period_label, on_done, report_failed):
+            bot.reply_to(message, REPORT_PENDING_TEXT)
 
+    except Exception as e:
+        report_failed(e)
+
+
+def delete_text(user_id: int) -> str:
     deleted = sheets_helper.delete_last_entry(user_id)
     if deleted:
-        text = (
+        return (
             "🗑 <b>Entri terakhir dihapus:</b>\n\n"
             f"  📅 {deleted['timestamp']}\n"
             f"  💰 {format_rupiah(deleted['price'])}\n"
             f"  🏷 {deleted['item']}\n"
             f"  {deleted['category']}"
         )
-    else:
-        text = "📭 Tidak ada entri untuk dihapus."
-
-    bot.reply_to(message, text)
+    return "📭 Tidak ada entri untuk dihapus."
 
 
-@bot.message_handler(func=lambda msg: msg.text and not msg.text.startswith("/"))
-def handle_expense(message):
+@bot.message_handler(commands=["delete"])
+@metrics.handler_seconds.timed()
+def cmd_delete(message):
     bot.send_chat_action(message.chat.id, "typing")
+    bot.reply_to(message, delete_text(message.from_user.id))
+
+
+def _bulk_expense_text(message) -> str:
+    entries, errors = parse_many(message.text)
+
+    if not entries:
+        return (
+            "❌ <b>Tidak ada baris yang dikenali.</b>\n\n"
+            "Tulis satu pengeluaran per baris dengan format:\n"
+            "<code>[harga] [nama item] - [deskripsi]</code>\n\n"
+            "Ketik /help untuk panduan lengkap."
+        )
+
+    user_id = message.from_user.id
+    user_name = message.from_user.first_name or "User"
+
+    try:
+        results = sheets_helper.add_expenses(user_id, user_name, entries)
+
+        lines = [f"✅ <b>{len(results)} pengeluaran tercatat!</b>\n", f"  👤 {user_name}"]
+        for r in results:
+            desc = f" <i>({r['description']})</i>" if r["description"] else ""
+            lines.append(f"  • {format_rupiah(r['price'])} — {r['item']}{desc} {r['category']}")
+        lines.append(f"\n💳 Subtotal: <b>{format_rupiah(sum(r['price'] for r in results))}</b>")
+        lines.append(f"  📅 {results[0]['timestamp']}")
+
+        if errors:
+            lines.append("\n⚠️ <b>Baris tidak dikenali:</b>")
+            for line_number, line in errors:
+                lines.append(f"  {line_number}. <code>{html.escape(line)}</code>")
+
+        today_total, today_count = sheets_helper.get_today_total(user_id)
+        lines.append(f"\n📊 Total hari ini: <b>{format_rupiah(today_total)}</b> ({today_count} transaksi)")
+
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f"❌ Gagal menyimpan: <code>{e}</code>"
+
+
+def expense_text(message) -> str:
+    if len([line for line in message.text.splitlines() if line.strip()]) > 1:
+        return _bulk_expense_text(message)
 
     parsed = parse_expense(message.text)
 
     if not parsed:
-        bot.reply_to(
-            message,
+        return (
             "❌ <b>Format tidak dikenali.</b>\n\n"
             "Gunakan format:\n"
             "<code>[harga] [nama item] - [deskripsi]</code>\n\n"
             "Contoh: <code>25k naspad rendang - tambah telur</code>\n"
-            "Ketik /help untuk panduan lengkap.",
+            "Ketik /help untuk panduan lengkap."
         )
-        return
 
     user_id = message.from_user.id
     user_name = message.from_user.first_name or "User"
@@ -267,18 +356,25 @@ def handle_expense(message):
             f"  📅 {result['timestamp']}\n"
         )
 
-        today_expenses = sheets_helper.get_today_expenses(user_id)
-        today_total = sum(e["price"] for e in today_expenses)
+        today_total, today_count = sheets_helper.get_today_total(user_id)
 
-        text += f"\n📊 Total hari ini: <b>{format_rupiah(today_total)}</b> ({len(today_expenses)} transaksi)"
+        text += f"\n📊 Total hari ini: <b>{format_rupiah(today_total)}</b> ({today_count} transaksi)"
 
-        bot.reply_to(message, text)
+        return text
 
     except Exception as e:
-        bot.reply_to(message, f"❌ Gagal menyimpan: <code>{e}</code>")
+        return f"❌ Gagal menyimpan: <code>{e}</code>"
+
+
+@bot.message_handler(func=lambda msg: msg.text and not msg.text.startswith("/"))
+@metrics.handler_seconds.timed()
+def handle_expense(message):
+    bot.send_chat_action(message.chat.id, "typing")
+    bot.reply_to(message, expense_text(message))
 
 
 if __name__ == "__main__":
+    sheets_helper.start_write_queue()
     print("Bot berjalan dalam mode polling...")
     print("Tekan Ctrl+C untuk berhenti.\n")
     bot.infinity_polling(timeout=60, long_polling_timeout=60)
@@ -19,3 +19,50 @@ _required = {
 for key, value in _required.items():
     if not value:
         raise ValueError(f"Missing required config: {key}. Please set it in credential.env")
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sheets")
+STORAGE_PATH = os.path.join(BASE_DIR, os.getenv("STORAGE_PATH", "expenses.db"))
+
+SHEET_CACHE_TTL = int(os.getenv("SHEET_CACHE_TTL", "600"))
+SHEETS_PARTITION_BY_MONTH = os.getenv("SHEETS_PARTITION_BY_MONTH", "false").lower() == "true"
+
+SHEETS_READS_PER_MINUTE = int(os.getenv("SHEETS_READS_PER_MINUTE", "60"))
+SHEETS_WRITES_PER_MINUTE = int(os.getenv("SHEETS_WRITES_PER_MINUTE", "60"))
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+SHEETS_BACKOFF_BASE_MS = int(os.getenv("SHEETS_BACKOFF_BASE_MS", "500"))
+SHEETS_BACKOFF_MAX_MS = int(os.getenv("SHEETS_BACKOFF_MAX_MS", "32000"))
+
+LOCAL_REPLICA_PATH = os.path.join(BASE_DIR, os.getenv("LOCAL_REPLICA_PATH")) if os.getenv("LOCAL_REPLICA_PATH") else None
+REPLICA_SYNC_INTERVAL = int(os.getenv("REPLICA_SYNC_INTERVAL", "30"))
+REPLICA_RECONCILE_INTERVAL = int(os.getenv("REPLICA_RECONCILE_INTERVAL", "3600"))
+
+if SHEETS_PARTITION_BY_MONTH and LOCAL_REPLICA_PATH:
+    raise ValueError("LOCAL_REPLICA_PATH cannot be combined with SHEETS_PARTITION_BY_MONTH")
+
+WRITE_BEHIND_JOURNAL = os.path.join(BASE_DIR, os.getenv("WRITE_BEHIND_JOURNAL")) if os.getenv("WRITE_BEHIND_JOURNAL") else None
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "2000"))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "3"))
+
+BOT_ASYNC = os.getenv("BOT_ASYNC", "false").lower() == "true"
+ASYNC_SHEETS_WORKERS = int(os.getenv("ASYNC_SHEETS_WORKERS", "8"))
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "20"))
+TELEGRAM_KEEPALIVE_SECONDS = int(os.getenv("TELEGRAM_KEEPALIVE_SECONDS", "60"))
+
+# Off by default: the webhook runs with bot.threaded = False, so background threads are opt-in for hosts that allow them.
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "0"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "100"))
+WEBHOOK_ENQUEUE_TIMEOUT = float(os.getenv("WEBHOOK_ENQUEUE_TIMEOUT", "5"))
+
+UPDATE_DEDUP_SIZE = int(os.getenv("UPDATE_DEDUP_SIZE", "1000"))
+UPDATE_DEDUP_PATH = os.path.join(BASE_DIR, os.getenv("UPDATE_DEDUP_PATH")) if os.getenv("UPDATE_DEDUP_PATH") else None
+
+ROLLUP_PATH = os.path.join(BASE_DIR, os.getenv("ROLLUP_PATH")) if os.getenv("ROLLUP_PATH") else None
+ROLLUP_REBUILD_INTERVAL = int(os.getenv("ROLLUP_REBUILD_INTERVAL", "3600"))
+
+ROW_INDEX_REBUILD_INTERVAL = int(os.getenv("ROW_INDEX_REBUILD_INTERVAL", "3600"))
+
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Rendering in worker processes (plus their delivery threads) is opt-in for the same reason as WEBHOOK_WORKERS.
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "0"))
@@ -0,0 +1,226 @@
+import re
+import sys
+import threading
+from array import array
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from itertools import compress
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_EPOCH = datetime(1970, 1, 1)
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+_CANONICAL_TIMESTAMP = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}")
+
+_category_lock = threading.Lock()
+_category_codes = {}
+_category_names = []
+
+
+def intern_category(name: str) -> int:
+    code = _category_codes.get(name)
+    if code is None:
+        with _category_lock:
+            code = _category_codes.get(name)
+            if code is None:
+                code = len(_category_names)
+                _category_names.append(name)
+                _category_codes[name] = code
+    return code
+
+
+def parse_timestamp(text: str) -> datetime:
+    if _CANONICAL_TIMESTAMP.fullmatch(text):
+        return datetime.fromisoformat(text)
+    return datetime.strptime(text, TIMESTAMP_FORMAT)
+
+
+def timestamps_in_order(values: list[str]) -> bool:
+    return all(map(_CANONICAL_TIMESTAMP.fullmatch, values)) and all(map(str.__le__, values, values[1:]))
+
+
+def timestamp_bounds(start_date: datetime, end_date: datetime) -> tuple[str, str]:
+    if start_date.microsecond:
+        start_date = start_date.replace(microsecond=0) + timedelta(seconds=1)
+    return (
+        start_date.isoformat(sep=" ", timespec="seconds"),
+        end_date.isoformat(sep=" ", timespec="seconds"),
+    )
+
+
+def to_epoch(dt: datetime) -> int:
+    return int((dt - _EPOCH).total_seconds())
+
+
+def from_epoch(seconds: int) -> datetime:
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+class ExpenseBatch(Sequence):
+
+    __slots__ = ("timestamps", "user_ids", "prices", "category_codes", "user_names", "items", "descriptions")
+
+    def __init__(self):
+        self.timestamps = array("q")
+        self.user_ids = array("q")
+        self.prices = array("q")
+        self.category_codes = array("i")
+        self.user_names = []
+        self.items = []
+        self.descriptions = []
+
+    def append(self, timestamp: datetime, user_id, user_name: str, price: int, item: str, description: str, category: str):
+        epoch = to_epoch(timestamp)
+        user_id = int(user_id)
+        if not _INT64_MIN <= price <= _INT64_MAX or not _INT64_MIN <= user_id <= _INT64_MAX:
+            raise OverflowError("value does not fit in an int64 column")
+
+        self.timestamps.append(epoch)
+        self.user_ids.append(user_id)
+        self.prices.append(price)
+        self.category_codes.append(intern_category(category))
+        self.user_names.append(sys.intern(user_name))
+        self.items.append(item)
+        self.descriptions.append(description)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._take(range(len(self))[index])
+
+        return {
+            "timestamp": from_epoch(self.timestamps[index]).strftime(TIMESTAMP_FORMAT),
+            "user_id": str(self.user_ids[index]),
+            "user_name": self.user_names[index],
+            "price": self.prices[index],
+            "item": self.items[index],
+            "description": self.descriptions[index],
+            "category": _category_names[self.category_codes[index]],
+        }
+
+    def __eq__(self, other):
+        if isinstance(other, ExpenseBatch):
+            return len(self) == len(other) and list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __add__(self, other):
+        if isinstance(other, list) and not other:
+            return self
+        result = self._take(range(len(self)))
+        result.extend(other)
+        return result
+
+    def __radd__(self, other):
+        if isinstance(other, list) and not other:
+            return self
+        return NotImplemented
+
+    def extend(self, other: "ExpenseBatch"):
+        self.timestamps.extend(other.timestamps)
+        self.user_ids.extend(other.user_ids)
+        self.prices.extend(other.prices)
+        self.category_codes.extend(other.category_codes)
+        self.user_names.extend(other.user_names)
+        self.items.extend(other.items)
+        self.descriptions.extend(other.descriptions)
+
+    def _take(self, indices) -> "ExpenseBatch":
+        result = ExpenseBatch()
+        if isinstance(indices, range) and indices.step == 1:
+            part = slice(indices.start, indices.stop)
+            for name in self.__slots__:
+                setattr(result, name, getattr(self, name)[part])
+            return result
+
+        for name in self.__slots__:
+            column = getattr(self, name)
+            values = [column[i] for i in indices]
+            setattr(result, name, array(column.typecode, values) if isinstance(column, array) else values)
+        return result
+
+    def filter(self, mask) -> "ExpenseBatch":
+        return self._take(list(compress(range(len(self)), mask)))
+
+    def filter_user(self, user_id: int) -> "ExpenseBatch":
+        return self.filter(map(int(user_id).__eq__, self.user_ids))
+
+    def filter_time(self, start_date: datetime, end_date: datetime) -> "ExpenseBatch":
+        start, end = to_epoch(start_date), to_epoch(end_date)
+        return self.filter(start <= ts <= end for ts in self.timestamps)
+
+    def categories(self) -> list[str]:
+        return [_category_names[code] for code in self.category_codes]
+
+    def total(self) -> int:
+        return sum(self.prices)
+
+    def sum_by_category(self) -> dict:
+        return self.price_stats()[3]
+
+    def price_stats(self) -> tuple[int, int | None, int | None, dict]:
+        total = 0
+        low = high = None
+        totals_by_code = {}
+        for code, price in zip(self.category_codes, self.prices):
+            total += price
+            if low is None or price < low:
+                low = price
+            if high is None or price > high:
+                high = price
+            totals_by_code[code] = totals_by_code.get(code, 0) + price
+        return total, low, high, {_category_names[code]: value for code, value in totals_by_code.items()}
+
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state["category_names"] = list(_category_names)
+        return state
+
+    def __setstate__(self, state):
+        names = state.pop("category_names")
+        remap = {code: intern_category(name) for code, name in enumerate(names)}
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.category_codes = array("i", (remap[code] for code in self.category_codes))
+
+
+def filter_rows(rows: list[list], start_date: datetime, end_date: datetime, user_id: int = None) -> ExpenseBatch:
+    return filter_rows_indexed(rows, start_date, end_date, user_id)[0]
+
+
+def filter_rows_indexed(rows: list[list], start_date: datetime, end_date: datetime, user_id: int = None) -> tuple[ExpenseBatch, list[int]]:
+    start_str, end_str = timestamp_bounds(start_date, end_date)
+    user_str = str(user_id) if user_id else None
+
+    expenses = ExpenseBatch()
+    positions = []
+    for position, row in enumerate(rows):
+        if len(row) < 7:
+            continue
+        ts = row[0]
+        try:
+            # Canonical timestamps sort lexically, so only rows inside the bounds get parsed.
+            if _CANONICAL_TIMESTAMP.fullmatch(ts):
+                if not start_str <= ts <= end_str:
+                    continue
+                row_date = datetime.fromisoformat(ts)
+            else:
+                row_date = datetime.strptime(ts, TIMESTAMP_FORMAT)
+                if not start_date <= row_date <= end_date:
+                    continue
+            if user_str and row[1] != user_str:
+                continue
+            price = int(float(row[3])) if row[3] else 0
+            expenses.append(row_date, row[1], row[2], price, row[4], row[5], row[6])
+            positions.append(position)
+        except (ValueError, IndexError, OverflowError):
+            continue
+
+    return expenses, positions
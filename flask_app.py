@@ -1,16 +1,22 @@
 import sys
+import time
 import logging
 import traceback
 
 import telebot
-from flask import Flask, request, abort
+from flask import Flask, Response, request, abort
 
 import config
-from bot import bot
+import metrics
+import sheets_helper
+from bot import bot, report_jobs
+from update_dedup import RecentUpdates
+from update_queue import AsyncUpdateDispatcher, UpdateDispatcher
 
 app = Flask(__name__)
 
 bot.threaded = False
+sheets_helper.start_write_queue()
 
 logging.basicConfig(stream=sys.stderr, level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -26,6 +32,37 @@ class WebhookExceptionHandler(telebot.ExceptionHandler):
 bot.exception_handler = WebhookExceptionHandler()
 
 
+def _process_update(update):
+    sheets_helper.reset_api_call_count()
+    started = time.perf_counter()
+    bot.process_new_updates([update])
+    metrics.update_seconds.observe(time.perf_counter() - started)
+    logger.info(f"Update processed successfully ({sheets_helper.get_api_call_count()} Sheets API calls)")
+
+
+if config.BOT_ASYNC:
+    import async_bot
+
+    dispatcher = AsyncUpdateDispatcher(async_bot.process_update, max_pending=config.WEBHOOK_QUEUE_SIZE)
+else:
+    dispatcher = UpdateDispatcher(
+        _process_update,
+        workers=config.WEBHOOK_WORKERS,
+        max_queue=config.WEBHOOK_QUEUE_SIZE,
+    ) if config.WEBHOOK_WORKERS > 0 else None
+
+_recent_updates = RecentUpdates(config.UPDATE_DEDUP_SIZE, config.UPDATE_DEDUP_PATH)
+
+metrics.Gauge(
+    "expensebot_update_queue_depth", "Updates waiting for a webhook worker.",
+    lambda: dispatcher.depth() if dispatcher else 0,
+)
+metrics.Gauge(
+    "expensebot_report_jobs_queued", "PDF report jobs rendering or waiting for a worker.",
+    lambda: report_jobs.stats()["queue_depth"] if report_jobs else 0,
+)
+
+
 @app.route("/webhook", methods=["POST"])
 def webhook():
     if request.headers.get("content-type") == "application/json":
@@ -33,11 +70,31 @@ def webhook():
         logger.info("Webhook received update")
         try:
             update = telebot.types.Update.de_json(json_str)
-            bot.process_new_updates([update])
-            logger.info("Update processed successfully")
         except Exception as e:
-            logger.error(f"Error processing update: {e}")
+            logger.error(f"Error decoding update: {e}")
             logger.error(traceback.format_exc())
+            return "", 200
+
+        # Telegram redelivers updates it timed out on; acknowledging the repeat keeps it from being applied twice.
+        if not _recent_updates.add(update.update_id):
+            metrics.duplicate_updates.inc()
+            logger.info(f"Update {update.update_id} already received, ignoring redelivery")
+            return "", 200
+
+        if dispatcher is None:
+            try:
+                _process_update(update)
+            except Exception as e:
+                logger.error(f"Error processing update: {e}")
+                logger.error(traceback.format_exc())
+                _recent_updates.discard(update.update_id)
+                return "", 200
+        elif not dispatcher.submit(update, timeout=config.WEBHOOK_ENQUEUE_TIMEOUT):
+            logger.warning(f"Update queue full ({dispatcher.depth()} pending), asking Telegram to retry")
+            _recent_updates.discard(update.update_id)
+            return "", 503
+
+        _recent_updates.commit(update.update_id)
         return "", 200
     else:
         abort(403)
@@ -59,6 +116,11 @@ def remove_webhook():
     return "Webhook removed.", 200
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/", methods=["GET"])
 def index():
     return "Expense Tracker Bot is running!", 200
\ No newline at end of file
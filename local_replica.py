@@ -0,0 +1,145 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from expense_batch import TIMESTAMP_FORMAT, ExpenseBatch, parse_timestamp, timestamp_bounds
+
+
+def expenses_schema(key_column: str) -> str:
+    return f"""
+CREATE TABLE IF NOT EXISTS expenses (
+    {key_column},
+    timestamp TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    user_name TEXT NOT NULL,
+    price INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_user_ts ON expenses (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_expenses_ts ON expenses (timestamp);
+"""
+
+
+def select_expenses(conn: sqlite3.Connection, lock: threading.Lock, order_column: str, start_date: datetime, end_date: datetime,
+                    user_id: int = None, limit: int = None) -> ExpenseBatch:
+    sql = (
+        "SELECT timestamp, user_id, user_name, price, item, description, category "
+        "FROM expenses WHERE timestamp BETWEEN ? AND ?"
+    )
+    params = list(timestamp_bounds(start_date, end_date))
+    if user_id:
+        sql += " AND user_id = ?"
+        params.append(str(user_id))
+    if limit:
+        sql += f" ORDER BY {order_column} DESC LIMIT ?"
+        params.append(limit)
+    else:
+        sql += f" ORDER BY {order_column}"
+
+    with lock:
+        rows = conn.execute(sql, params).fetchall()
+    if limit:
+        rows.reverse()
+
+    expenses = ExpenseBatch()
+    for r in rows:
+        try:
+            expenses.append(datetime.fromisoformat(r[0]), *r[1:])
+        except (ValueError, OverflowError):
+            continue
+    return expenses
+
+
+_SCHEMA = expenses_schema("row_number INTEGER NOT NULL") + """
+CREATE INDEX IF NOT EXISTS idx_expenses_row ON expenses (row_number);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def _to_record(row_number: int, row: list) -> tuple | None:
+    row = list(row) + [""] * (7 - len(row))
+    try:
+        ts = parse_timestamp(row[0]).strftime(TIMESTAMP_FORMAT)
+        price = int(float(row[3])) if row[3] else 0
+    except (ValueError, OverflowError):
+        return None
+    return (row_number, ts, str(row[1]), row[2], price, row[4], row[5], row[6])
+
+
+class LocalReplica:
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def _get_meta(self, key: str) -> float:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_meta(self, key: str, value: float):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def row_count(self) -> int:
+        with self._lock:
+            return int(self._get_meta("row_count"))
+
+    def needs_reconcile(self, interval: float) -> bool:
+        with self._lock:
+            return time.time() - self._get_meta("last_reconcile") >= interval
+
+    def needs_sync(self, interval: float) -> bool:
+        with self._lock:
+            return time.time() - self._get_meta("last_sync") >= interval
+
+    def replace_all(self, all_rows: list[list]):
+        records = [_to_record(i, row) for i, row in enumerate(all_rows[1:], start=2)]
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM expenses")
+            self._conn.executemany(
+                "INSERT INTO expenses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [r for r in records if r],
+            )
+            self._set_meta("row_count", max(len(all_rows), 1))
+            self._set_meta("last_reconcile", now)
+            self._set_meta("last_sync", now)
+
+    def append_synced(self, first_row_number: int, rows: list[list]):
+        records = [_to_record(i, row) for i, row in enumerate(rows, start=first_row_number)]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM expenses WHERE row_number >= ?", (first_row_number,))
+            self._conn.executemany(
+                "INSERT INTO expenses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [r for r in records if r],
+            )
+            self._set_meta("row_count", first_row_number + len(rows) - 1)
+            self._set_meta("last_sync", time.time())
+
+    def record_append(self, row_number: int, row: list):
+        record = _to_record(row_number, row)
+        with self._lock, self._conn:
+            row_count = int(self._get_meta("row_count"))
+            if row_number != row_count + 1:
+                self._set_meta("last_sync", 0)
+                return
+            if record:
+                self._conn.execute("INSERT INTO expenses VALUES (?, ?, ?, ?, ?, ?, ?, ?)", record)
+            self._set_meta("row_count", row_number)
+
+    def record_delete(self, row_number: int):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM expenses WHERE row_number = ?", (row_number,))
+            self._conn.execute("UPDATE expenses SET row_number = row_number - 1 WHERE row_number > ?", (row_number,))
+            self._set_meta("row_count", max(int(self._get_meta("row_count")) - 1, 1))
+
+    def query(self, start_date: datetime, end_date: datetime, user_id: int = None, limit: int = None) -> ExpenseBatch:
+        return select_expenses(self._conn, self._lock, "row_number", start_date, end_date, user_id, limit)
@@ -0,0 +1,141 @@
+import time
+import bisect
+import inspect
+import functools
+import threading
+
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+
+    def __init__(self, name: str, help_text: str, label: str = None, buckets: tuple = _BUCKETS):
+        self.name = name
+        self._help = help_text
+        self._label = label
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+        _registry.append(self)
+
+    def observe(self, seconds: float, label_value: str = ""):
+        index = bisect.bisect_left(self._buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self._buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def timed(self, label_value: str = None):
+        def decorator(func):
+            value = func.__name__ if label_value is None else label_value
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - started, value)
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, value)
+
+            return wrapper
+
+        return decorator
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self._help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+        for label_value, (counts, total) in sorted(series.items()):
+            prefix = f'{self._label}="{_escape(label_value)}",' if self._label else ""
+            labels = f"{{{prefix[:-1]}}}" if prefix else ""
+            cumulative = 0
+            for bound, count in zip(self._buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_value(bound)}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name: str, help_text: str, label: str = None):
+        self.name = name
+        self._help = help_text
+        self._label = label
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, label_value: str = "", amount: float = 1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self._help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_value, value in sorted(values.items()):
+            labels = f'{{{self._label}="{_escape(label_value)}"}}' if self._label else ""
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+
+    def __init__(self, name: str, help_text: str, read_func):
+        self.name = name
+        self._help = help_text
+        self._read_func = read_func
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self._help}", f"# TYPE {self.name} gauge", f"{self.name} {_format_value(self._read_func())}"]
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+update_seconds = Histogram("expensebot_update_seconds", "Time to process one Telegram update.")
+duplicate_updates = Counter("expensebot_duplicate_updates_total", "Webhook redeliveries of an already processed update_id.")
+handler_seconds = Histogram("expensebot_handler_seconds", "Time spent in each bot handler.", "handler")
+sheets_call_seconds = Histogram("expensebot_sheets_call_seconds", "Latency of each Google Sheets API call.", "method")
+sheets_call_errors = Counter("expensebot_sheets_call_errors_total", "Google Sheets API calls that raised.", "method")
+sheets_retries = Counter("expensebot_sheets_retries_total", "Google Sheets API calls retried after a quota or server error.", "method")
+sheets_coalesced_reads = Counter("expensebot_sheets_coalesced_reads_total", "Reads served by an identical in-flight request.", "method")
+parse_seconds = Histogram(
+    "expensebot_parse_seconds", "Time spent parsing expense messages.", "function",
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01),
+)
+report_render_seconds = Histogram("expensebot_report_render_seconds", "Time to render a PDF report.", "mode")
+write_behind_dead_letter_rows = Counter("expensebot_write_behind_dead_letter_rows_total", "Queued rows given up on after repeated flush failures.")
@@ -0,0 +1,27 @@
+import argparse
+
+import sheets_helper
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split the Expenses tab into one tab per month (Expenses_YYYY_MM).")
+    parser.add_argument("--dry-run", action="store_true", help="only count the rows that would be copied")
+    args = parser.parse_args()
+
+    result = sheets_helper.migrate_to_partitions(dry_run=args.dry_run)
+
+    for title, count in result["migrated"].items():
+        print(f"{'would copy' if args.dry_run else 'copied'} {count} rows -> {title}")
+    for title in result["complete"]:
+        print(f"skipped {title}: already migrated")
+    for title, (existing, expected) in result["mismatched"].items():
+        print(f"CHECK {title}: tab has {existing} rows that do not match the {expected} source rows for this month; left untouched")
+    if result["unparsed_rows"]:
+        print(f"left {len(result['unparsed_rows'])} rows with unreadable timestamps in {sheets_helper.SHEET_TITLE}: {result['unparsed_rows']}")
+
+    if not args.dry_run:
+        print(f"Done. Set SHEETS_PARTITION_BY_MONTH=true and reload the bot; {sheets_helper.SHEET_TITLE} is left untouched as a backup.")
+
+
+if __name__ == "__main__":
+    main()
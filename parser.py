@@ -1,5 +1,7 @@
 import re
 
+import metrics
+
 CATEGORIES = {
     "🍔 Makanan": [
         "nasi", "naspad", "makan", "bakso", "mie", "ayam", "sate", "soto",
@@ -64,13 +66,71 @@ def _parse_price(number_str: str, suffix: str | None) -> int:
     return int(value)
 
 
-def _detect_category(text: str) -> str:
-    text_lower = text.lower()
-    for category, keywords in CATEGORIES.items():
+_category_matcher = None
+
+
+def _trie_pattern(words) -> str:
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def _build_category_matcher() -> tuple:
+    priority = {}
+    for index, keywords in enumerate(CATEGORIES.values()):
         for keyword in keywords:
-            if keyword in text_lower:
-                return category
-    return "📦 Lainnya"
+            priority.setdefault(keyword, index)
+
+    empty_index = priority.pop("", None)
+
+    # At any position the pattern yields the longest keyword starting there, and every
+    # shorter keyword starting at the same position is one of its prefixes.
+    owners = {
+        keyword: min(index for prefix, index in priority.items() if keyword.startswith(prefix))
+        for keyword in priority
+    }
+
+    pattern = re.compile(f"(?=({_trie_pattern(priority)}))") if priority else None
+    snapshot = (tuple(CATEGORIES), {category: list(keywords) for category, keywords in CATEGORIES.items()})
+    return snapshot, pattern, owners, empty_index, list(CATEGORIES)
+
+
+def _get_category_matcher() -> tuple:
+    global _category_matcher
+    if (
+        _category_matcher is None
+        or _category_matcher[0][1] != CATEGORIES
+        or _category_matcher[0][0] != tuple(CATEGORIES)
+    ):
+        _category_matcher = _build_category_matcher()
+    return _category_matcher
+
+
+def _detect_category(text: str) -> str:
+    _, pattern, owners, empty_index, categories = _get_category_matcher()
+
+    best = len(categories) if empty_index is None else empty_index
+    if pattern is not None:
+        for match in pattern.finditer(text.lower()):
+            index = owners[match.group(1)]
+            if index < best:
+                best = index
+                if best == 0:
+                    break
+
+    return categories[best] if best < len(categories) else "📦 Lainnya"
 
 
 def _split_item_description(text: str) -> tuple[str, str | None]:
@@ -82,6 +142,7 @@ def _split_item_description(text: str) -> tuple[str, str | None]:
     return text.strip(), None
 
 
+@metrics.parse_seconds.timed()
 def parse_expense(text: str) -> dict | None:
     text = text.strip()
     if not text:
@@ -116,5 +177,21 @@ def parse_expense(text: str) -> dict | None:
     }
 
 
+@metrics.parse_seconds.timed()
+def parse_many(text: str) -> tuple[list[dict], list[tuple[int, str]]]:
+    expenses = []
+    errors = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        parsed = parse_expense(line)
+        if parsed:
+            expenses.append(parsed)
+        else:
+            errors.append((line_number, line.strip()))
+    return expenses, errors
+
+
 def format_rupiah(amount: int) -> str:
     return f"Rp {amount:,.0f}".replace(",", ".")
+
@@ -1,10 +1,9 @@
-import os
 import re
-import tempfile
 from datetime import datetime
 from fpdf import FPDF
 
 from parser import format_rupiah
+from aggregates import summarize
 
 _EMOJI_PATTERN = re.compile(
     "["
@@ -64,7 +63,7 @@ class ExpenseReport(FPDF):
         self.cell(0, 10, f"Halaman {self.page_no()}/{{nb}}", align="C")
 
 
-def generate_report(expenses: list[dict], period_label: str) -> str:
+def generate_report(expenses: list[dict], period_label: str) -> bytes:
     pdf = ExpenseReport(period_label)
     pdf.alias_nb_pages()
     pdf.add_page()
@@ -74,17 +73,15 @@ def generate_report(expenses: list[dict], period_label: str) -> str:
         pdf.set_font("Helvetica", "I", 12)
         pdf.cell(0, 20, "Tidak ada data pengeluaran untuk periode ini.", align="C")
     else:
-        _add_summary_section(pdf, expenses)
-        _add_category_breakdown(pdf, expenses)
-        _add_expense_table(pdf, expenses)
+        summary = summarize(expenses, recent=0)
+        _add_summary_section(pdf, summary)
+        _add_category_breakdown(pdf, summary)
+        _add_expense_table(pdf, expenses, summary["total"])
 
-    filepath = os.path.join(tempfile.gettempdir(), f"expense_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
-    pdf.output(filepath)
-    return filepath
+    return bytes(pdf.output())
 
 
-def _add_summary_section(pdf: FPDF, expenses: list[dict]):
-    total = sum(e["price"] for e in expenses)
+def _add_summary_section(pdf: FPDF, summary: dict):
 
     pdf.set_font("Helvetica", "B", 13)
     pdf.set_text_color(33, 37, 41)
@@ -94,39 +91,31 @@ def _add_summary_section(pdf: FPDF, expenses: list[dict]):
 
     pdf.cell(60, 8, "Total Transaksi:")
     pdf.set_font("Helvetica", "B", 11)
-    pdf.cell(0, 8, f"{len(expenses)} transaksi", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 8, f"{summary['count']} transaksi", new_x="LMARGIN", new_y="NEXT")
 
     pdf.set_font("Helvetica", "", 11)
     pdf.cell(60, 8, "Total Pengeluaran:")
     pdf.set_font("Helvetica", "B", 13)
     pdf.set_text_color(231, 76, 60)
-    pdf.cell(0, 8, format_rupiah(total), new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 8, format_rupiah(summary["total"]), new_x="LMARGIN", new_y="NEXT")
 
-    avg = total // len(expenses) if expenses else 0
     pdf.set_font("Helvetica", "", 11)
     pdf.set_text_color(33, 37, 41)
     pdf.cell(60, 8, "Rata-rata per Transaksi:")
     pdf.set_font("Helvetica", "B", 11)
-    pdf.cell(0, 8, format_rupiah(avg), new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 8, format_rupiah(summary["average"]), new_x="LMARGIN", new_y="NEXT")
 
     pdf.ln(5)
 
 
-def _add_category_breakdown(pdf: FPDF, expenses: list[dict]):
-    categories = {}
-    for e in expenses:
-        cat = e.get("category", "Lainnya")
-        categories[cat] = categories.get(cat, 0) + e["price"]
-
-    sorted_cats = sorted(categories.items(), key=lambda x: x[1], reverse=True)
-
+def _add_category_breakdown(pdf: FPDF, summary: dict):
     pdf.set_font("Helvetica", "B", 13)
     pdf.set_text_color(33, 37, 41)
     pdf.cell(0, 10, "Per Kategori", new_x="LMARGIN", new_y="NEXT")
 
-    total = sum(e["price"] for e in expenses)
+    total = summary["total"]
 
-    for cat_name, cat_total in sorted_cats:
+    for cat_name, cat_total in summary["categories"].items():
         pct = (cat_total / total * 100) if total > 0 else 0
 
         safe_cat = _strip_emoji(cat_name)
@@ -141,7 +130,7 @@ def _add_category_breakdown(pdf: FPDF, expenses: list[dict]):
     pdf.ln(5)
 
 
-def _add_expense_table(pdf: FPDF, expenses: list[dict]):
+def _add_expense_table(pdf: FPDF, expenses: list[dict], total: int):
     pdf.set_font("Helvetica", "B", 13)
     pdf.set_text_color(33, 37, 41)
     pdf.cell(0, 10, "Detail Transaksi", new_x="LMARGIN", new_y="NEXT")
@@ -191,7 +180,6 @@ def _add_expense_table(pdf: FPDF, expenses: list[dict]):
         pdf.cell(col_widths[4], 7, format_rupiah(expense["price"]), border=1, fill=fill, align="R")
         pdf.ln()
 
-    total = sum(e["price"] for e in expenses)
     pdf.set_font("Helvetica", "B", 9)
     pdf.set_fill_color(44, 62, 80)
     pdf.set_text_color(255, 255, 255)
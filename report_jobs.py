@@ -0,0 +1,101 @@
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _render(expenses: list[dict], period_label: str) -> tuple[bytes, float]:
+    from report_generator import generate_report
+
+    started = time.perf_counter()
+    try:
+        pdf_bytes = generate_report(expenses, period_label)
+    except Exception as e:
+        # fpdf exceptions do not survive unpickling in the parent and would break the pool.
+        raise RuntimeError(str(e)) from None
+    return pdf_bytes, time.perf_counter() - started
+
+
+class ReportJobQueue:
+
+    def __init__(self, max_workers: int = 2):
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._delivery = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report-delivery")
+        self._pending = set()
+        self._completed = 0
+        self._failed = 0
+        self._render_seconds_total = 0.0
+        self._render_seconds_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def is_pending(self, key) -> bool:
+        with self._lock:
+            return key in self._pending
+
+    def submit(self, key, expenses: list[dict], period_label: str, on_done, on_error) -> bool:
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            future = self._get_executor().submit(_render, expenses, period_label)
+
+        def _finished(f):
+            self._delivery.submit(self._deliver, key, f, on_done, on_error)
+
+        future.add_done_callback(_finished)
+        return True
+
+    def _deliver(self, key, future, on_done, on_error):
+        try:
+            pdf_bytes, elapsed = future.result()
+        except Exception as e:
+            with self._lock:
+                self._pending.discard(key)
+                self._failed += 1
+                if isinstance(e, BrokenProcessPool) and self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+            logger.error(f"Report job {key} failed: {e}")
+            on_error(e)
+            return
+
+        metrics.report_render_seconds.observe(elapsed, "pool")
+        with self._lock:
+            self._pending.discard(key)
+            self._completed += 1
+            self._render_seconds_total += elapsed
+            self._render_seconds_max = max(self._render_seconds_max, elapsed)
+            depth = len(self._pending)
+        logger.info(f"Report job {key} rendered in {elapsed:.2f}s ({depth} jobs queued)")
+
+        try:
+            on_done(pdf_bytes)
+        except Exception as e:
+            logger.error(f"Report job {key} delivery failed: {e}")
+            on_error(e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending),
+                "completed": self._completed,
+                "failed": self._failed,
+                "render_seconds_total": self._render_seconds_total,
+                "render_seconds_max": self._render_seconds_max,
+                "render_seconds_avg": self._render_seconds_total / self._completed if self._completed else 0.0,
+            }
@@ -0,0 +1,149 @@
+import time
+import bisect
+import threading
+from array import array
+
+
+class UserRowIndex:
+
+    def __init__(self, depth: int = 20):
+        self._depth = depth
+        self._lock = threading.Lock()
+        self._row_count = None
+        self._built_at = 0.0
+        self._rows_by_user = {}
+        self._tails = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._row_count = None
+
+    def needs_rebuild(self, interval: float, user_id) -> bool:
+        with self._lock:
+            if self._row_count is None or time.time() - self._built_at >= interval:
+                return True
+            # Only the newest rows per user keep their contents; a deeper delete needs a fresh read.
+            user = str(user_id)
+            return bool(self._rows_by_user.get(user)) and not self._tails.get(user)
+
+    def rebuild(self, all_rows: list[list]):
+        rows_by_user = {}
+        tails = {}
+        for row_number, row in enumerate(all_rows[1:], start=2):
+            if len(row) >= 7:
+                rows_by_user.setdefault(row[1], array("q")).append(row_number)
+                tails.setdefault(row[1], []).append(row)
+
+        with self._lock:
+            self._rows_by_user = rows_by_user
+            self._tails = {user: rows[-self._depth:] for user, rows in tails.items()}
+            self._row_count = max(len(all_rows), 1)
+            self._built_at = time.time()
+
+    def verify(self, timestamps: list[str]) -> bool:
+        with self._lock:
+            if self._row_count is None:
+                return True
+            consistent = len(timestamps) == self._row_count and all(
+                row_number <= len(timestamps) and timestamps[row_number - 1] == row[0]
+                for user, tail in self._tails.items()
+                for row_number, row in zip(self._rows_by_user[user][-len(tail):], tail)
+            )
+            if not consistent:
+                self._row_count = None
+            return consistent
+
+    def record_append(self, row_number: int, row: list):
+        with self._lock:
+            if self._row_count is None:
+                return
+            if row_number != self._row_count + 1:
+                self._row_count = None
+                return
+            self._row_count = row_number
+            if len(row) >= 7:
+                user = str(row[1])
+                self._rows_by_user.setdefault(user, array("q")).append(row_number)
+                tail = self._tails.setdefault(user, [])
+                tail.append([str(value) for value in row])
+                del tail[:-self._depth]
+
+    @property
+    def row_count(self) -> int | None:
+        with self._lock:
+            return self._row_count
+
+    def last_row(self, user_id) -> tuple[int, list] | None:
+        with self._lock:
+            user = str(user_id)
+            rows = self._rows_by_user.get(user)
+            tail = self._tails.get(user)
+            if not rows or not tail:
+                return None
+            return rows[-1], tail[-1]
+
+    def record_delete(self, row_number: int):
+        with self._lock:
+            if self._row_count is None:
+                return
+            for user, rows in self._rows_by_user.items():
+                position = bisect.bisect_left(rows, row_number)
+                if position < len(rows) and rows[position] == row_number:
+                    del rows[position]
+                    tail = self._tails[user]
+                    tail_position = position - (len(rows) + 1 - len(tail))
+                    if tail_position >= 0:
+                        del tail[tail_position]
+                for i in range(position, len(rows)):
+                    rows[i] -= 1
+            self._row_count = max(self._row_count - 1, 1)
+
+
+class TimestampColumn:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+        self._read_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+    def needs_reload(self, interval: float) -> bool:
+        with self._lock:
+            return self._values is None or time.time() - self._read_at >= interval
+
+    def replace(self, values: list[str]):
+        with self._lock:
+            self._values = list(values)
+            self._read_at = time.time()
+
+    def snapshot(self) -> list[str] | None:
+        with self._lock:
+            return None if self._values is None else list(self._values)
+
+    def extend(self, known_count: int, values: list[str]) -> bool:
+        with self._lock:
+            if self._values is None or len(self._values) != known_count:
+                return False
+            self._values.extend(values)
+            return True
+
+    def record_append(self, row_number: int, row: list):
+        with self._lock:
+            if self._values is None:
+                return
+            if row_number != len(self._values) + 1:
+                self._values = None
+                return
+            self._values.append(str(row[0]))
+
+    def record_delete(self, row_number: int):
+        with self._lock:
+            if self._values is None:
+                return
+            if row_number > len(self._values):
+                self._values = None
+                return
+            del self._values[row_number - 1]
@@ -0,0 +1,109 @@
+import time
+import random
+import threading
+
+import gspread
+
+import metrics
+
+READ_METHODS = {"get", "get_all_values", "col_values", "row_values", "batch_get", "open_by_key", "worksheet", "worksheets"}
+
+
+def _is_retryable(error: Exception, is_read: bool) -> bool:
+    if not isinstance(error, gspread.exceptions.APIError):
+        return False
+    # A 5xx on a write may still have been applied, so only reads retry on server errors.
+    return error.code == 429 or (is_read and 500 <= error.code < 600)
+
+
+class TokenBucket:
+
+    def __init__(self, per_minute: int):
+        self._rate = per_minute / 60
+        self._capacity = per_minute
+        self._tokens = float(per_minute)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            # Tokens may go negative: each caller reserves its slot and sleeps until it comes due.
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class _InFlight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QuotaAwareClient:
+
+    def __init__(self, reads_per_minute: int, writes_per_minute: int, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 32.0):
+        self._reads = TokenBucket(reads_per_minute)
+        self._writes = TokenBucket(writes_per_minute)
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._write_generation = 0
+
+    def call(self, func, *args, **kwargs):
+        method = getattr(func, "__name__", "call")
+        if method not in READ_METHODS:
+            try:
+                return self._call_with_retry(func, method, False, args, kwargs)
+            finally:
+                with self._lock:
+                    self._write_generation += 1
+
+        # Reads only join a request that started after the latest finished write, so callers still see their own writes.
+        owner = getattr(func, "__self__", None)
+        with self._lock:
+            key = (id(owner), method, repr(args), repr(sorted(kwargs.items())), self._write_generation)
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _InFlight()
+
+        if not leader:
+            metrics.sheets_coalesced_reads.inc(method)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._call_with_retry(func, method, True, args, kwargs)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    def _call_with_retry(self, func, method: str, is_read: bool, args, kwargs):
+        bucket = self._reads if is_read else self._writes
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self._max_retries or not _is_retryable(e, is_read):
+                    raise
+            metrics.sheets_retries.inc(method)
+            time.sleep(random.uniform(0, min(self._backoff_max, self._backoff_base * 2 ** attempt)))
+            attempt += 1
@@ -1,31 +1,161 @@
+import re
+import time
+import bisect
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime, timedelta
 
 import config
+import metrics
+from aggregates import CategoryRollups, summarize
+from expense_batch import ExpenseBatch, filter_rows, filter_rows_indexed, parse_timestamp, timestamp_bounds, timestamps_in_order
+from local_replica import LocalReplica
+from row_index import TimestampColumn, UserRowIndex
+from sheets_client import QuotaAwareClient
+from storage import MemoryBackend, SQLiteBackend, StorageBackend, to_expense
+from write_queue import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
 
 SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
 ]
 
-_credentials = Credentials.from_service_account_file(config.GOOGLE_CREDS_FILE, scopes=SCOPES)
-_client = gspread.authorize(_credentials)
+_client = None
+_client_lock = threading.Lock()
+
+_quota_client = QuotaAwareClient(
+    config.SHEETS_READS_PER_MINUTE,
+    config.SHEETS_WRITES_PER_MINUTE,
+    max_retries=config.SHEETS_MAX_RETRIES,
+    backoff_base=config.SHEETS_BACKOFF_BASE_MS / 1000,
+    backoff_max=config.SHEETS_BACKOFF_MAX_MS / 1000,
+)
+
+_replica = LocalReplica(config.LOCAL_REPLICA_PATH) if config.LOCAL_REPLICA_PATH else None
+
+_rollups = CategoryRollups(config.ROLLUP_PATH)
+
+_row_indexes = {}
+_timestamp_columns = {}
+_row_indexes_lock = threading.Lock()
+_delete_lock = threading.Lock()
+
+_rebuild_lock = threading.Lock()
+_rollup_writers = threading.Condition()
+_active_writes = 0
+_rebuilding = False
+
+_data_generation = 0
+_user_versions = {}
+_versions_lock = threading.Lock()
+
+_MIGRATION_CHUNK_ROWS = 500
+_MISSING_PARTITION_RECHECK_SECONDS = 10
 
 HEADERS = ["Timestamp", "User ID", "User", "Harga", "Item", "Deskripsi", "Kategori"]
+FIELDS = ("timestamp", "user_id", "user_name", "price", "item", "description", "category")
+SUMMARY_FIELDS = ("timestamp", "user_id", "price", "category")
+
+_COLUMNS = "ABCDEFG"
+_FILTER_FIELDS = ("timestamp", "user_id", "category")
+
+SHEET_TITLE = "Expenses"
+_PARTITION_TITLE = re.compile(rf"{SHEET_TITLE}_\d{{4}}_\d{{2}}")
+
+
+_sheets = {}
+_partitions = None
+_partitions_listed_at = 0.0
+_sheet_lock = threading.Lock()
+
+_call_stats = threading.local()
+
+
+def _api_call(func, *args, **kwargs):
+    _call_stats.count = getattr(_call_stats, "count", 0) + 1
+    method = getattr(func, "__name__", "call")
+    started = time.perf_counter()
+    try:
+        return _quota_client.call(func, *args, **kwargs)
+    except Exception:
+        metrics.sheets_call_errors.inc(method)
+        raise
+    finally:
+        metrics.sheets_call_seconds.observe(time.perf_counter() - started, method)
+
+
+def reset_api_call_count():
+    _call_stats.count = 0
+
+
+def get_api_call_count() -> int:
+    return getattr(_call_stats, "count", 0)
+
 
+def _get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                credentials = Credentials.from_service_account_file(config.GOOGLE_CREDS_FILE, scopes=SCOPES)
+                _client = gspread.authorize(credentials)
+    return _client
 
-def _get_sheet():
-    spreadsheet = _client.open_by_key(config.SPREADSHEET_ID)
+
+def invalidate_sheet_cache():
+    global _partitions
+    with _sheet_lock:
+        _sheets.clear()
+        _partitions = None
+    with _row_indexes_lock:
+        for index in (*_row_indexes.values(), *_timestamp_columns.values()):
+            index.invalidate()
+
+
+def _row_index_for(title: str) -> UserRowIndex:
+    with _row_indexes_lock:
+        index = _row_indexes.get(title)
+        if index is None:
+            index = _row_indexes[title] = UserRowIndex()
+        return index
+
+
+def _timestamp_column_for(title: str) -> TimestampColumn:
+    with _row_indexes_lock:
+        column = _timestamp_columns.get(title)
+        if column is None:
+            column = _timestamp_columns[title] = TimestampColumn()
+        return column
+
+
+def partition_title(moment: datetime) -> str:
+    return f"{SHEET_TITLE}_{moment.year:04d}_{moment.month:02d}"
+
+
+def _sheet_title_for(row: list) -> str:
+    if not config.SHEETS_PARTITION_BY_MONTH:
+        return SHEET_TITLE
+    return partition_title(parse_timestamp(row[0]))
+
+
+def _open_sheet(title: str):
+    spreadsheet = _api_call(_get_client().open_by_key, config.SPREADSHEET_ID)
     try:
-        sheet = spreadsheet.worksheet("Expenses")
+        sheet = _api_call(spreadsheet.worksheet, title)
     except gspread.exceptions.WorksheetNotFound:
-        sheet = spreadsheet.add_worksheet(title="Expenses", rows=1000, cols=10)
+        sheet = _api_call(spreadsheet.add_worksheet, title=title, rows=1000, cols=10)
 
-    first_row = sheet.row_values(1)
+    first_row = _api_call(sheet.row_values, 1)
     if not first_row or first_row != HEADERS:
-        sheet.update("A1:G1", [HEADERS])
-        sheet.format("A1:G1", {
+        _api_call(sheet.update, "A1:G1", [HEADERS])
+        _api_call(sheet.format, "A1:G1", {
             "textFormat": {"bold": True},
             "backgroundColor": {"red": 0.2, "green": 0.6, "blue": 0.9},
         })
@@ -33,82 +163,518 @@ def _get_sheet():
     return sheet
 
 
-def add_expense(user_id: int, user_name: str, price: int, item: str, description: str | None, category: str) -> dict:
-    sheet = _get_sheet()
-    now = datetime.now()
-    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+def _get_sheet(title: str = SHEET_TITLE):
+    with _sheet_lock:
+        cached = _sheets.get(title)
+        if cached is None or time.monotonic() >= cached[1]:
+            cached = _sheets[title] = (_open_sheet(title), time.monotonic() + config.SHEET_CACHE_TTL)
+            if _partitions is not None and _PARTITION_TITLE.fullmatch(title) and title not in _partitions:
+                bisect.insort(_partitions, title)
+        return cached[0]
 
-    row = [timestamp, str(user_id), user_name, price, item, description or "", category]
-    sheet.append_row(row, value_input_option="USER_ENTERED")
 
-    return {
-        "timestamp": timestamp,
-        "price": price,
-        "item": item,
-        "description": description,
-        "category": category,
-        "row_number": len(sheet.get_all_values()),
-    }
+def list_partitions(max_age: float = None) -> list[str]:
+    global _partitions, _partitions_listed_at
+    with _sheet_lock:
+        if _partitions is None or time.monotonic() - _partitions_listed_at >= (config.SHEET_CACHE_TTL if max_age is None else max_age):
+            spreadsheet = _api_call(_get_client().open_by_key, config.SPREADSHEET_ID)
+            worksheets = _api_call(spreadsheet.worksheets)
+            _partitions = sorted(ws.title for ws in worksheets if _PARTITION_TITLE.fullmatch(ws.title))
+            _partitions_listed_at = time.monotonic()
+        return list(_partitions)
+
+
+def _sheet_titles(start_date: datetime, end_date: datetime) -> list[str]:
+    if not config.SHEETS_PARTITION_BY_MONTH:
+        return [SHEET_TITLE]
+    # Month tabs sort chronologically by title, so only the tabs overlapping the range are read.
+    first, last = partition_title(start_date), partition_title(end_date)
+    titles = list_partitions()
+    current = partition_title(datetime.now())
+    if first <= current <= last and current not in titles:
+        # Another worker may have opened this month's tab since the list was cached (month rollover); recheck it soon rather than after the full TTL.
+        titles = list_partitions(_MISSING_PARTITION_RECHECK_SECONDS)
+    return [title for title in titles if first <= title <= last]
+
+
+def _is_stale_sheet_error(error: Exception) -> bool:
+    if isinstance(error, gspread.exceptions.WorksheetNotFound):
+        return True
+    return isinstance(error, gspread.exceptions.APIError) and error.code in (400, 404)
+
+
+def _with_sheet(operation, title: str = SHEET_TITLE):
+    try:
+        return operation(_get_sheet(title))
+    except gspread.exceptions.GSpreadException as e:
+        if not _is_stale_sheet_error(e):
+            raise
+        invalidate_sheet_cache()
+        return operation(_get_sheet(title))
+
+
+def _last_row_of_range(a1_range: str) -> int:
+    cells = a1_range.rsplit("!", 1)[-1]
+    end_row, _ = gspread.utils.a1_to_rowcol(cells.split(":")[-1])
+    return end_row
+
+
+def _append_to_sheet(title: str, rows: list[list]) -> int:
+    response = _with_sheet(lambda sheet: _api_call(sheet.append_rows, rows, value_input_option="USER_ENTERED"), title)
+    first_row_number = _last_row_of_range(response["updates"]["updatedRange"]) - len(rows) + 1
+
+    row_index = _row_index_for(title)
+    timestamps = _timestamp_column_for(title)
+    for offset, row in enumerate(rows):
+        row_index.record_append(first_row_number + offset, row)
+        timestamps.record_append(first_row_number + offset, row)
+        if _replica:
+            _replica.record_append(first_row_number + offset, row)
+
+    return first_row_number
+
+
+def _append_rows(rows: list[list]) -> list[int]:
+    positions_by_title = {}
+    for position, row in enumerate(rows):
+        positions_by_title.setdefault(_sheet_title_for(row), []).append(position)
+
+    row_numbers = [None] * len(rows)
+    for title, positions in positions_by_title.items():
+        first_row_number = _append_to_sheet(title, [rows[p] for p in positions])
+        for offset, position in enumerate(positions):
+            row_numbers[position] = first_row_number + offset
+
+    return row_numbers
+
+
+def _is_rejected_write(error: Exception) -> bool:
+    # A 400 that survives _with_sheet's reopen is the sheet refusing the rows themselves; retrying cannot fix it.
+    return isinstance(error, gspread.exceptions.APIError) and error.code == 400
+
+
+def _drop_dead_letters(rows: list[list]):
+    # The rows were counted in the rollups when queued but never reached the sheet; the next read rebuilds without them.
+    _rollups.invalidate()
+
+
+_write_queue = None
+
+
+def start_write_queue():
+    global _write_queue
+    # Only the serving process opens the journal; CLI tools and report worker processes import this module without one.
+    if _write_queue or config.STORAGE_BACKEND != "sheets" or not config.WRITE_BEHIND_JOURNAL or multiprocessing.parent_process():
+        return
+
+    try:
+        _write_queue = WriteBehindQueue(
+            config.WRITE_BEHIND_JOURNAL,
+            _append_rows,
+            max_batch=config.WRITE_BEHIND_BATCH_SIZE,
+            flush_interval=config.WRITE_BEHIND_FLUSH_MS / 1000,
+            batch_key=_sheet_title_for,
+            max_attempts=config.WRITE_BEHIND_MAX_ATTEMPTS,
+            is_permanent=_is_rejected_write,
+            on_dead_letter=_drop_dead_letters,
+        )
+    except BlockingIOError as e:
+        logger.warning(f"Write-behind journal {config.WRITE_BEHIND_JOURNAL} is owned by another process ({e}); writing directly")
+
 
+def _sync_replica(sheet):
+    if _replica.needs_reconcile(config.REPLICA_RECONCILE_INTERVAL):
+        _replica.replace_all(_api_call(sheet.get_all_values))
+        return
 
-def get_expenses_by_date_range(start_date: datetime, end_date: datetime, user_id: int = None) -> list[dict]:
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
+    first_new_row = _replica.row_count + 1
+    new_rows = _api_call(sheet.get, f"A{first_new_row}:G")
+    _replica.append_synced(first_new_row, new_rows)
+
+
+def _pending_expenses(start_date: datetime, end_date: datetime, user_id: int = None) -> ExpenseBatch:
+    if not _write_queue:
+        return ExpenseBatch()
+    return filter_rows(_write_queue.pending_rows(), start_date, end_date, user_id)
+
+
+def _query_replica(start_date: datetime, end_date: datetime, user_id: int = None, limit: int = None) -> ExpenseBatch:
+    if _replica.needs_sync(config.REPLICA_SYNC_INTERVAL) or _replica.needs_reconcile(config.REPLICA_RECONCILE_INTERVAL):
+        _with_sheet(_sync_replica)
+    return _replica.query(start_date, end_date, user_id, limit)
+
+
+def _cached_timestamps(sheet, column: TimestampColumn) -> list[str] | None:
+    if column.needs_reload(config.ROW_INDEX_REBUILD_INTERVAL):
+        return None
+    timestamps = column.snapshot()
+    if not timestamps:
+        return None
+
+    # The last known cell is read again with the new ones, so rows removed behind the cache show up as a mismatch.
+    tail = [row[0] if row else "" for row in _api_call(sheet.get, f"A{len(timestamps)}:A")]
+    if tail[:1] != timestamps[-1:] or not column.extend(len(timestamps), tail[1:]):
+        return None
+    return timestamps + tail[1:]
+
+
+def _read_timestamps(sheet) -> list[str]:
+    column = _timestamp_column_for(sheet.title)
+    row_index = _row_index_for(sheet.title)
+    timestamps = _cached_timestamps(sheet, column)
+    if timestamps is None or not row_index.verify(timestamps):
+        timestamps = _api_call(sheet.col_values, 1)
+        column.replace(timestamps)
+        row_index.verify(timestamps)
+    return timestamps
+
+
+def _find_block(timestamps: list[str], start_date: datetime, end_date: datetime) -> tuple[int, int]:
+    if not timestamps_in_order(timestamps):
+        # Manual edits broke the append order, so the row block cannot be located by bisection; read every row.
+        return 2, len(timestamps) + 1
+
+    start_str, end_str = timestamp_bounds(start_date, end_date)
+    first = bisect.bisect_left(timestamps, start_str)
+    last = bisect.bisect_right(timestamps, end_str)
+    return first + 2, last + 1
+
+
+def _get_rows(sheet, first_row: int, last_row: int, fields: tuple = None) -> list[list]:
+    if not fields:
+        return _api_call(sheet.get, f"A{first_row}:G{last_row}")
+
+    indices = sorted({FIELDS.index(f) for f in (*_FILTER_FIELDS, *fields)})
+    columns = _api_call(sheet.batch_get, [f"{_COLUMNS[i]}{first_row}:{_COLUMNS[i]}{last_row}" for i in indices])
+
+    rows = [[""] * len(FIELDS) for _ in range(max(map(len, columns), default=0))]
+    for index, column in zip(indices, columns):
+        for row, cell in zip(rows, column):
+            if cell:
+                row[index] = cell[0]
+    # A full read returns rows with an empty last column short, and filter_rows skips those.
+    return [row if row[-1] else [] for row in rows]
+
+
+def _read_block(sheet, start_date: datetime, end_date: datetime, user_id: int = None, fields: tuple = None) -> tuple[ExpenseBatch, list[int]]:
+    first_row, last_row = _find_block(_read_timestamps(sheet)[1:], start_date, end_date)
+    if first_row > last_row:
+        return ExpenseBatch(), []
+    expenses, positions = filter_rows_indexed(_get_rows(sheet, first_row, last_row, fields), start_date, end_date, user_id)
+    return expenses, [first_row + position for position in positions]
+
+
+def _fetch_newest(sheet, row_numbers: list[int], start_date: datetime, end_date: datetime, user_id: int, limit: int) -> ExpenseBatch:
+    found = ExpenseBatch()
+    end = len(row_numbers)
+    while end and len(found) < limit:
+        begin = max(end - (limit - len(found)), 0)
+        blocks = _api_call(sheet.batch_get, [f"A{row_number}:G{row_number}" for row_number in row_numbers[begin:end]])
+        found = filter_rows([block[0] if block else [] for block in blocks], start_date, end_date, user_id) + found
+        end = begin
+    return found
+
+
+def _recent_rows(sheet, start_date: datetime, end_date: datetime, user_id: int, limit: int) -> ExpenseBatch:
+    # The period's block is matched on the filter columns alone; full rows are fetched only for the newest matches.
+    _, row_numbers = _read_block(sheet, start_date, end_date, user_id, _FILTER_FIELDS)
+    return _fetch_newest(sheet, row_numbers, start_date, end_date, user_id, limit)
+
+
+def _summarize_sheets(start_date: datetime, end_date: datetime, user_id: int, recent: int) -> dict:
+    pending = _pending_expenses(start_date, end_date, user_id)
+    blocks = [
+        (title, *_with_sheet(lambda sheet: _read_block(sheet, start_date, end_date, user_id, SUMMARY_FIELDS), title))
+        for title in _sheet_titles(start_date, end_date)
+    ]
+
+    expenses = ExpenseBatch()
+    for _, batch, _ in blocks:
+        expenses.extend(batch)
+    summary = summarize(expenses + pending, recent=0)
+
+    if summary["count"] and recent:
+        tail = pending[-recent:]
+        # The projected read already located every match, so only the newest few full rows are fetched.
+        for title, batch, row_numbers in reversed(blocks):
+            if len(tail) >= recent:
+                break
+            if batch:
+                tail = _with_sheet(
+                    lambda sheet: _fetch_newest(sheet, row_numbers, start_date, end_date, user_id, recent - len(tail)), title
+                ) + tail
+        summary["recent"] = tail
+
+    return summary
+
+
+def _index_matches_sheet(sheet, row_index: UserRowIndex, row_number: int, row: list) -> bool:
+    row_count = row_index.row_count
+    if row_count is None:
+        return False
+    target, beyond = _api_call(sheet.batch_get, [f"A{row_number}:E{row_number}", f"A{row_count + 1}:A"])
+    cells = (target[0] if target else []) + [""] * 5
+    return not beyond and cells[0] == row[0] and cells[1] == row[1] and cells[4] == row[4]
+
+
+def _rebuild_indexes(sheet, row_index: UserRowIndex, timestamps: TimestampColumn):
+    all_rows = _api_call(sheet.get_all_values)
+    row_index.rebuild(all_rows)
+    timestamps.replace([row[0] if row else "" for row in all_rows])
+
+
+def _delete_user_entry(sheet, user_id: int) -> dict | None:
+    row_index = _row_index_for(sheet.title)
+    timestamps = _timestamp_column_for(sheet.title)
+    if row_index.needs_rebuild(config.ROW_INDEX_REBUILD_INTERVAL, user_id):
+        _rebuild_indexes(sheet, row_index, timestamps)
+
+    found = row_index.last_row(user_id)
+    if found and not _index_matches_sheet(sheet, row_index, *found):
+        # The sheet changed behind the index (manual edit, another worker), so the cached row number may now hold someone else's row.
+        _rebuild_indexes(sheet, row_index, timestamps)
+        found = row_index.last_row(user_id)
+    if not found:
+        return None
+
+    row_number, row = found
+    try:
+        _api_call(sheet.delete_rows, row_number)
+    except Exception:
+        row_index.invalidate()
+        timestamps.invalidate()
+        raise
+    row_index.record_delete(row_number)
+    timestamps.record_delete(row_number)
+    if _replica:
+        _replica.record_delete(row_number)
+
+    return to_expense(row)
+
+
+def _delete_last_entry(sheet, user_id: int = None) -> dict | None:
+    if user_id:
+        return _delete_user_entry(sheet, user_id)
+
+    all_rows = _api_call(sheet.get_all_values)
 
     if len(all_rows) <= 1:
+        return None
+
+    last_row = all_rows[-1]
+    last_row_number = len(all_rows)
+    _api_call(sheet.delete_rows, last_row_number)
+    _row_index_for(sheet.title).record_delete(last_row_number)
+    _timestamp_column_for(sheet.title).record_delete(last_row_number)
+    if _replica:
+        _replica.record_delete(last_row_number)
+
+    return to_expense(last_row)
+
+
+class SheetsBackend:
+
+    def add(self, row: list) -> int | None:
+        return self.append_rows([row])[0]
+
+    def append_rows(self, rows: list[list]) -> list[int | None]:
+        if _write_queue:
+            for row in rows:
+                _write_queue.submit(row)
+            return [None] * len(rows)
+
+        return _append_rows(rows)
+
+    def query(self, start_date: datetime, end_date: datetime, user_id: int = None, fields: tuple = None) -> ExpenseBatch:
+        pending = _pending_expenses(start_date, end_date, user_id)
+
+        if _replica:
+            return _query_replica(start_date, end_date, user_id) + pending
+
+        expenses = ExpenseBatch()
+        for title in _sheet_titles(start_date, end_date):
+            expenses.extend(_with_sheet(lambda sheet: _read_block(sheet, start_date, end_date, user_id, fields)[0], title))
+        return expenses + pending
+
+    def recent(self, start_date: datetime, end_date: datetime, user_id: int = None, limit: int = 5) -> ExpenseBatch:
+        found = _pending_expenses(start_date, end_date, user_id)
+        if len(found) >= limit:
+            return found[-limit:]
+
+        if _replica:
+            return _query_replica(start_date, end_date, user_id, limit - len(found)) + found
+
+        for title in reversed(_sheet_titles(start_date, end_date)):
+            if len(found) >= limit:
+                break
+            found = _with_sheet(lambda sheet: _recent_rows(sheet, start_date, end_date, user_id, limit - len(found)), title) + found
+        return found
+
+    def summarize(self, start_date: datetime, end_date: datetime, user_id: int = None, recent: int = 5) -> dict:
+        if _replica:
+            return summarize(self.query(start_date, end_date, user_id), recent)
+
+        return _summarize_sheets(start_date, end_date, user_id, recent)
+
+    def delete_last(self, user_id: int = None) -> dict | None:
+        if _write_queue:
+            row = _write_queue.discard_last(lambda r: not user_id or r[1] == str(user_id))
+            if row:
+                return to_expense(row)
+
+        with _delete_lock:
+            # The newest month tab holds the newest rows; older tabs are only consulted when it has none to delete.
+            for title in reversed(_sheet_titles(datetime.min, datetime.max)):
+                deleted = _with_sheet(lambda sheet: _delete_last_entry(sheet, user_id), title)
+                if deleted:
+                    return deleted
+            return None
+
+
+def _create_backend(name: str) -> StorageBackend:
+    if name == "sheets":
+        return SheetsBackend()
+    if name == "sqlite":
+        return SQLiteBackend(config.STORAGE_PATH)
+    if name == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {name}")
+
+
+_backend = _create_backend(config.STORAGE_BACKEND)
+
+
+def add_expenses(user_id: int, user_name: str, entries: list[dict]) -> list[dict]:
+    now = datetime.now()
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    rows = [
+        [timestamp, str(user_id), user_name, e["price"], e["item"], e["description"] or "", e["category"]]
+        for e in entries
+    ]
+    if not rows:
         return []
 
-    expenses = []
-    for row in all_rows[1:]:
-        if len(row) < 7:
-            continue
+    with _rollup_write():
+        row_numbers = _backend.append_rows(rows)
+        for e in entries:
+            _rollups.add(user_id, timestamp, e["category"], e["price"])
+    _bump_user_version(user_id)
+
+    return [
+        {
+            "timestamp": timestamp,
+            "price": e["price"],
+            "item": e["item"],
+            "description": e["description"],
+            "category": e["category"],
+            "row_number": row_number,
+        }
+        for e, row_number in zip(entries, row_numbers)
+    ]
+
+
+def add_expense(user_id: int, user_name: str, price: int, item: str, description: str | None, category: str) -> dict:
+    entry = {"price": price, "item": item, "description": description, "category": category}
+    return add_expenses(user_id, user_name, [entry])[0]
+
+
+def get_expenses_by_date_range(start_date: datetime, end_date: datetime, user_id: int = None, fields: tuple = None) -> ExpenseBatch:
+    return _backend.query(start_date, end_date, user_id, fields)
+
+
+def _bump_user_version(user_id):
+    with _versions_lock:
+        _user_versions[str(user_id)] = _user_versions.get(str(user_id), 0) + 1
+
+
+@contextmanager
+def _rollup_write():
+    global _active_writes
+    with _rollup_writers:
+        _rollup_writers.wait_for(lambda: not _rebuilding)
+        _active_writes += 1
+    try:
+        yield
+    finally:
+        with _rollup_writers:
+            _active_writes -= 1
+            _rollup_writers.notify_all()
+
+
+def _ensure_rollups():
+    global _data_generation, _rebuilding
+    if not _rollups.needs_rebuild(config.ROLLUP_REBUILD_INTERVAL):
+        return
+
+    with _rebuild_lock:
+        # Callers that queued behind a rebuild find the rollups fresh and skip their own full read.
+        if not _rollups.needs_rebuild(config.ROLLUP_REBUILD_INTERVAL):
+            return
+
+        # A write landing between the full read and the table swap would be lost or counted twice, so writers wait it out.
+        with _rollup_writers:
+            _rebuilding = True
+            _rollup_writers.wait_for(lambda: _active_writes == 0)
         try:
-            row_date = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S")
-            if start_date <= row_date <= end_date:
-                if user_id and row[1] != str(user_id):
-                    continue
-                expenses.append({
-                    "timestamp": row[0],
-                    "user_id": row[1],
-                    "user_name": row[2],
-                    "price": int(float(row[3])) if row[3] else 0,
-                    "item": row[4],
-                    "description": row[5],
-                    "category": row[6],
-                })
-        except (ValueError, IndexError):
-            continue
+            _rollups.rebuild(get_expenses_by_date_range(datetime.min, datetime.max, fields=SUMMARY_FIELDS))
+        finally:
+            with _rollup_writers:
+                _rebuilding = False
+                _rollup_writers.notify_all()
+
+        with _versions_lock:
+            _data_generation += 1
 
-    return expenses
+
+def get_data_version(user_id: int) -> tuple[int, int]:
+    _ensure_rollups()
+    with _versions_lock:
+        return _data_generation, _user_versions.get(str(user_id), 0)
+
+
+def get_period_summary(start_date: datetime, end_date: datetime, user_id: int = None, recent: int = 5) -> dict:
+    _ensure_rollups()
+    total, count, categories = _rollups.summarize(start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"), user_id)
+
+    return {
+        "total": total,
+        "count": count,
+        "average": total // count if count else 0,
+        "min": None,
+        "max": None,
+        "categories": categories,
+        "recent": _backend.recent(start_date, end_date, user_id, recent) if count and recent else [],
+    }
 
 
-def get_today_expenses(user_id: int = None) -> list[dict]:
+def _today_range() -> tuple[datetime, datetime]:
     now = datetime.now()
     start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-    return get_expenses_by_date_range(start, end, user_id)
+    return start, end
 
 
-def get_week_expenses(user_id: int = None) -> list[dict]:
+def _week_range() -> tuple[datetime, datetime]:
     now = datetime.now()
     start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
     end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-    return get_expenses_by_date_range(start, end, user_id)
+    return start, end
 
 
-def get_month_expenses(user_id: int = None) -> list[dict]:
+def _month_range() -> tuple[datetime, datetime]:
     now = datetime.now()
     start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-    return get_expenses_by_date_range(start, end, user_id)
+    return start, end
 
 
-def get_quarter_expenses(quarter: int, user_id: int = None) -> list[dict]:
+def _quarter_range(quarter: int) -> tuple[datetime, datetime] | None:
     now = datetime.now()
     quarter_months = {1: (1, 3), 2: (4, 6), 3: (7, 9), 4: (10, 12)}
 
     if quarter not in quarter_months:
-        return []
+        return None
 
     start_month, end_month = quarter_months[quarter]
     start = now.replace(month=start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
@@ -118,47 +684,115 @@ def get_quarter_expenses(quarter: int, user_id: int = None) -> list[dict]:
     else:
         end = now.replace(month=end_month + 1, day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(seconds=1)
 
-    return get_expenses_by_date_range(start, end, user_id)
+    return start, end
 
 
-def get_year_expenses(user_id: int = None) -> list[dict]:
+def _year_range() -> tuple[datetime, datetime]:
     now = datetime.now()
     start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
     end = now.replace(month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
-    return get_expenses_by_date_range(start, end, user_id)
+    return start, end
+
+
+_PERIOD_RANGES = {"today": _today_range, "week": _week_range, "month": _month_range}
+
+
+def get_live_summary(period: str, user_id: int = None, recent: int = 5) -> dict:
+    start_date, end_date = _PERIOD_RANGES[period]()
+    return _backend.summarize(start_date, end_date, user_id, recent)
+
+
+def get_today_expenses(user_id: int = None, fields: tuple = None) -> ExpenseBatch:
+    return get_expenses_by_date_range(*_today_range(), user_id, fields)
+
+
+def get_today_total(user_id: int) -> tuple[int, int]:
+    summary = get_period_summary(*_today_range(), user_id, recent=0)
+    return summary["total"], summary["count"]
+
+
+def get_week_expenses(user_id: int = None, fields: tuple = None) -> ExpenseBatch:
+    return get_expenses_by_date_range(*_week_range(), user_id, fields)
+
+
+def get_month_expenses(user_id: int = None, fields: tuple = None) -> ExpenseBatch:
+    return get_expenses_by_date_range(*_month_range(), user_id, fields)
+
+
+def get_month_summary(user_id: int = None, recent: int = 5) -> dict:
+    return get_period_summary(*_month_range(), user_id, recent)
+
+
+def get_quarter_expenses(quarter: int, user_id: int = None) -> ExpenseBatch:
+    period = _quarter_range(quarter)
+    if not period:
+        return ExpenseBatch()
+    return get_expenses_by_date_range(*period, user_id)
+
+
+def get_quarter_summary(quarter: int, user_id: int = None) -> dict:
+    period = _quarter_range(quarter)
+    if not period:
+        return summarize([])
+    return get_period_summary(*period, user_id)
+
+
+def get_year_expenses(user_id: int = None) -> ExpenseBatch:
+    return get_expenses_by_date_range(*_year_range(), user_id)
+
+
+def get_year_summary(user_id: int = None) -> dict:
+    return get_period_summary(*_year_range(), user_id)
 
 
 def delete_last_entry(user_id: int = None) -> dict | None:
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
+    with _rollup_write():
+        deleted = _backend.delete_last(user_id)
+        if deleted:
+            _rollups.remove(deleted["user_id"], deleted["timestamp"], deleted["category"], deleted["price"])
 
-    if len(all_rows) <= 1:
-        return None
+    if deleted:
+        _bump_user_version(deleted["user_id"])
 
-    if user_id:
-        for i in range(len(all_rows) - 1, 0, -1):
-            row = all_rows[i]
-            if len(row) >= 7 and row[1] == str(user_id):
-                sheet.delete_rows(i + 1)
-                return {
-                    "timestamp": row[0],
-                    "user_name": row[2],
-                    "price": int(float(row[3])) if row[3] else 0,
-                    "item": row[4],
-                    "description": row[5],
-                    "category": row[6],
-                }
-        return None
+    return deleted
 
-    last_row = all_rows[-1]
-    last_row_number = len(all_rows)
-    sheet.delete_rows(last_row_number)
 
-    return {
-        "timestamp": last_row[0] if len(last_row) > 0 else "",
-        "user_name": last_row[2] if len(last_row) > 2 else "",
-        "price": int(float(last_row[3])) if len(last_row) > 3 and last_row[3] else 0,
-        "item": last_row[4] if len(last_row) > 4 else "",
-        "description": last_row[5] if len(last_row) > 5 else "",
-        "category": last_row[6] if len(last_row) > 6 else "",
-    }
+def _migration_key(row: list) -> tuple:
+    row = row + [""] * (len(FIELDS) - len(row))
+    return row[0], row[1], row[4]
+
+
+def migrate_to_partitions(dry_run: bool = False) -> dict:
+    source_rows = _with_sheet(lambda sheet: _api_call(sheet.get_all_values))
+
+    rows_by_title = {}
+    unparsed_rows = []
+    for row_number, row in enumerate(source_rows[1:], start=2):
+        try:
+            rows_by_title.setdefault(partition_title(parse_timestamp(row[0])), []).append(row)
+        except (ValueError, IndexError):
+            unparsed_rows.append(row_number)
+
+    migrated = {}
+    complete = []
+    mismatched = {}
+    for title, rows in sorted(rows_by_title.items()):
+        if dry_run:
+            migrated[title] = len(rows)
+            continue
+
+        existing = _with_sheet(lambda sheet: _api_call(sheet.get_all_values), title)[1:]
+        if len(existing) > len(rows) or list(map(_migration_key, existing)) != list(map(_migration_key, rows[:len(existing)])):
+            # The tab holds rows that are not the start of this month's source rows (bot writes, manual edits); copying could duplicate them.
+            mismatched[title] = (len(existing), len(rows))
+            continue
+        if len(existing) == len(rows):
+            complete.append(title)
+            continue
+
+        # An interrupted run leaves a prefix of the month behind, so copying resumes after it.
+        for start in range(len(existing), len(rows), _MIGRATION_CHUNK_ROWS):
+            _append_to_sheet(title, rows[start:start + _MIGRATION_CHUNK_ROWS])
+        migrated[title] = len(rows) - len(existing)
+
+    return {"migrated": migrated, "complete": complete, "mismatched": mismatched, "unparsed_rows": unparsed_rows}
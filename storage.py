@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Protocol
+
+from aggregates import summarize
+from expense_batch import ExpenseBatch, filter_rows
+from local_replica import expenses_schema, select_expenses
+
+
+class StorageBackend(Protocol):
+
+    def add(self, row: list) -> int | None: ...
+
+    def append_rows(self, rows: list[list]) -> list[int | None]: ...
+
+    def query(self, start_date: datetime, end_date: datetime, user_id: int = None, fields: tuple = None) -> ExpenseBatch: ...
+
+    def recent(self, start_date: datetime, end_date: datetime, user_id: int = None, limit: int = 5) -> ExpenseBatch: ...
+
+    def summarize(self, start_date: datetime, end_date: datetime, user_id: int = None, recent: int = 5) -> dict: ...
+
+    def delete_last(self, user_id: int = None) -> dict | None: ...
+
+
+def to_expense(row: list) -> dict:
+    row = list(row) + [""] * (7 - len(row))
+    return {
+        "timestamp": row[0],
+        "user_id": str(row[1]),
+        "user_name": row[2],
+        "price": int(float(row[3])) if row[3] else 0,
+        "item": row[4],
+        "description": row[5],
+        "category": row[6],
+    }
+
+
+class MemoryBackend:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = []
+        self._next_id = 1
+
+    def add(self, row: list) -> int | None:
+        return self.append_rows([row])[0]
+
+    def append_rows(self, rows: list[list]) -> list[int | None]:
+        with self._lock:
+            first_id = self._next_id
+            self._rows.extend([str(value) for value in row] for row in rows)
+            self._next_id += len(rows)
+        return list(range(first_id, first_id + len(rows)))
+
+    def query(self, start_date: datetime, end_date: datetime, user_id: int = None, fields: tuple = None) -> ExpenseBatch:
+        with self._lock:
+            rows = list(self._rows)
+        return filter_rows(rows, start_date, end_date, user_id)
+
+    def recent(self, start_date: datetime, end_date: datetime, user_id: int = None, limit: int = 5) -> ExpenseBatch:
+        return self.query(start_date, end_date, user_id)[-limit:]
+
+    def summarize(self, start_date: datetime, end_date: datetime, user_id: int = None, recent: int = 5) -> dict:
+        return summarize(self.query(start_date, end_date, user_id), recent)
+
+    def delete_last(self, user_id: int = None) -> dict | None:
+        with self._lock:
+            for i in range(len(self._rows) - 1, -1, -1):
+                if not user_id or self._rows[i][1] == str(user_id):
+                    return to_expense(self._rows.pop(i))
+        return None
+
+
+class SQLiteBackend:
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(expenses_schema("id INTEGER PRIMARY KEY AUTOINCREMENT"))
+        self._conn.commit()
+
+    def add(self, row: list) -> int | None:
+        return self.append_rows([row])[0]
+
+    def append_rows(self, rows: list[list]) -> list[int | None]:
+        records = [to_expense(row) for row in rows]
+        with self._lock, self._conn:
+            return [
+                self._conn.execute(
+                    "INSERT INTO expenses (timestamp, user_id, user_name, price, item, description, category) "
+                    "VALUES (:timestamp, :user_id, :user_name, :price, :item, :description, :category)",
+                    record,
+                ).lastrowid
+                for record in records
+            ]
+
+    def query(self, start_date: datetime, end_date: datetime, user_id: int = None, fields: tuple = None) -> ExpenseBatch:
+        return select_expenses(self._conn, self._lock, "id", start_date, end_date, user_id)
+
+    def recent(self, start_date: datetime, end_date: datetime, user_id: int = None, limit: int = 5) -> ExpenseBatch:
+        return select_expenses(self._conn, self._lock, "id", start_date, end_date, user_id, limit)
+
+    def summarize(self, start_date: datetime, end_date: datetime, user_id: int = None, recent: int = 5) -> dict:
+        return summarize(self.query(start_date, end_date, user_id), recent)
+
+    def delete_last(self, user_id: int = None) -> dict | None:
+        sql = "SELECT id, timestamp, user_id, user_name, price, item, description, category FROM expenses"
+        params = []
+        if user_id:
+            sql += " WHERE user_id = ?"
+            params.append(str(user_id))
+        sql += " ORDER BY id DESC LIMIT 1"
+
+        with self._lock, self._conn:
+            row = self._conn.execute(sql, params).fetchone()
+            if not row:
+                return None
+            self._conn.execute("DELETE FROM expenses WHERE id = ?", (row[0],))
+        return to_expense(row[1:])
@@ -0,0 +1,75 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class RecentUpdates:
+
+    def __init__(self, capacity: int = 1000, path: str = None):
+        self._capacity = capacity
+        self._path = path
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+        self._file = None
+        self._lines = 0
+
+        if path:
+            self._load()
+            self._compact()
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return
+
+        with open(self._path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("-") and line[1:].isdigit():
+                    self._seen.pop(int(line[1:]), None)
+                elif line.isdigit():
+                    self._remember(int(line))
+
+    def _compact(self):
+        if self._file:
+            self._file.close()
+        tmp_path = f"{self._path}.tmp"
+        committed = [update_id for update_id, done in self._seen.items() if done]
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{update_id}\n" for update_id in committed)
+        os.replace(tmp_path, self._path)
+        self._file = open(self._path, "a", encoding="utf-8")
+        self._lines = len(committed)
+
+    def _remember(self, update_id: int, committed: bool = True):
+        self._seen[update_id] = committed
+        if len(self._seen) > self._capacity:
+            self._seen.popitem(last=False)
+
+    def _persist(self, line: str):
+        if not self._file:
+            return
+        self._file.write(f"{line}\n")
+        self._file.flush()
+        self._lines += 1
+        if self._lines > 2 * self._capacity:
+            self._compact()
+
+    def add(self, update_id: int) -> bool:
+        with self._lock:
+            if update_id in self._seen:
+                self._seen.move_to_end(update_id)
+                return False
+            self._remember(update_id, committed=False)
+            return True
+
+    def commit(self, update_id: int):
+        # Written only once the update is handled, so a process killed mid-update still accepts Telegram's redelivery after restart.
+        with self._lock:
+            if self._seen.get(update_id) is not False:
+                return
+            self._seen[update_id] = True
+            self._persist(str(update_id))
+
+    def discard(self, update_id: int):
+        with self._lock:
+            self._seen.pop(update_id, None)
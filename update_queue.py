@@ -0,0 +1,97 @@
+import queue
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _chat_key(update) -> int:
+    for field in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        message = getattr(update, field, None)
+        if message is not None:
+            return message.chat.id
+
+    callback_query = getattr(update, "callback_query", None)
+    if callback_query is not None:
+        return callback_query.from_user.id
+
+    return update.update_id
+
+
+class UpdateDispatcher:
+
+    def __init__(self, process_func, workers: int = 4, max_queue: int = 100):
+        self._process_func = process_func
+        self._queues = [queue.Queue(maxsize=max(max_queue // workers, 1)) for _ in range(workers)]
+        self._threads = [
+            threading.Thread(target=self._run, args=(q,), name=f"update-worker-{i}", daemon=True)
+            for i, q in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, update, timeout: float = None) -> bool:
+        shard = self._queues[_chat_key(update) % len(self._queues)]
+        try:
+            shard.put(update, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def _run(self, updates: queue.Queue):
+        while True:
+            update = updates.get()
+            try:
+                self._process_func(update)
+            except Exception as e:
+                logger.error(f"Error processing update {update.update_id}: {e}", exc_info=True)
+            finally:
+                updates.task_done()
+
+
+class AsyncUpdateDispatcher:
+
+    def __init__(self, process_coro, max_pending: int = 100):
+        self._process_coro = process_coro
+        self._max_pending = max_pending
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._tails = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="update-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, update, timeout: float = None) -> bool:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending < self._max_pending, timeout):
+                return False
+            self._pending += 1
+        self._loop.call_soon_threadsafe(self._schedule, update)
+        return True
+
+    def depth(self) -> int:
+        with self._cond:
+            return self._pending
+
+    def _schedule(self, update):
+        # Updates from one chat still run in arrival order; different chats interleave on the loop.
+        key = _chat_key(update)
+        task = self._loop.create_task(self._run(update, self._tails.get(key)))
+        self._tails[key] = task
+        task.add_done_callback(lambda t: self._tails.pop(key) if self._tails.get(key) is t else None)
+
+    async def _run(self, update, previous: asyncio.Task | None):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await self._process_coro(update)
+        except Exception as e:
+            logger.error(f"Error processing update {update.update_id}: {e}", exc_info=True)
+        finally:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify()
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import fcntl
+import atexit
+import logging
+import itertools
+import threading
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+
+    def __init__(
+        self, journal_path: str, flush_func, max_batch: int = 50, flush_interval: float = 2.0, batch_key=None,
+        max_attempts: int = 3, is_permanent=None, on_dead_letter=None,
+    ):
+        self._journal_path = journal_path
+        self._dead_letter_path = f"{journal_path}.dead"
+        self._flush_func = flush_func
+        self._max_attempts = max_attempts
+        self._is_permanent = is_permanent
+        self._on_dead_letter = on_dead_letter
+        self._max_batch = max_batch
+        self._batch_key = batch_key
+        self._flush_interval = flush_interval
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._next_id = 1
+        self._oldest_pending_at = None
+        self._inflight_upto = 0
+        self._closed = False
+
+        self._journal = open(journal_path, "a", encoding="utf-8")
+        try:
+            # A second owner would replay and re-append this process's rows, so the journal is held for the queue's lifetime.
+            fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._journal.close()
+            raise
+        self._replay()
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _replay(self):
+        entries = {}
+        discarded = set()
+        flushed_upto = 0
+        with open(self._journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "flushed" in record:
+                    flushed_upto = max(flushed_upto, record["flushed"])
+                elif "dead_letter" in record:
+                    flushed_upto = max(flushed_upto, record["dead_letter"])
+                elif "discarded" in record:
+                    discarded.add(record["discarded"])
+                else:
+                    entries[record["id"]] = record["row"]
+
+        self._pending = [
+            (i, row) for i, row in sorted(entries.items())
+            if i > flushed_upto and i not in discarded
+        ]
+        self._next_id = max(entries, default=flushed_upto) + 1
+        if self._pending:
+            self._oldest_pending_at = time.monotonic()
+            logger.info(f"Replaying {len(self._pending)} unflushed journal entries")
+        else:
+            self._journal.truncate(0)
+
+    def _write_journal(self, record: dict):
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def submit(self, row: list):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            entry_id = self._next_id
+            self._next_id += 1
+            self._write_journal({"id": entry_id, "row": row})
+            self._pending.append((entry_id, row))
+            if self._oldest_pending_at is None:
+                self._oldest_pending_at = time.monotonic()
+                self._cond.notify_all()
+            elif len(self._pending) >= self._max_batch:
+                self._cond.notify_all()
+
+    def pending_rows(self) -> list[list]:
+        with self._cond:
+            return [row for _, row in self._pending]
+
+    def discard_last(self, match) -> list | None:
+        with self._cond:
+            while True:
+                for index in range(len(self._pending) - 1, -1, -1):
+                    entry_id, row = self._pending[index]
+                    if match(row):
+                        break
+                else:
+                    return None
+
+                if entry_id > self._inflight_upto:
+                    self._write_journal({"discarded": entry_id})
+                    del self._pending[index]
+                    if not self._pending:
+                        self._oldest_pending_at = None
+                    return row
+
+                self._cond.wait()
+
+    def _dead_letter(self, batch: list, attempts: int, error: Exception):
+        rows = [row for _, row in batch]
+        with open(self._dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"failed_at": time.time(), "error": str(error), "rows": rows}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.write_behind_dead_letter_rows.inc(amount=len(rows))
+        logger.error(
+            f"Write-behind gave up on {len(rows)} rows after {attempts} attempts ({error}); "
+            f"moved them to {self._dead_letter_path}"
+        )
+
+        with self._cond:
+            self._write_journal({"dead_letter": batch[-1][0]})
+            self._pending = [entry for entry in self._pending if entry[0] > self._inflight_upto]
+            self._oldest_pending_at = time.monotonic() if self._pending else None
+            if not self._pending:
+                self._journal.truncate(0)
+            self._inflight_upto = 0
+            self._cond.notify_all()
+
+        if self._on_dead_letter:
+            self._on_dead_letter(rows)
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self._max_batch or self._closed:
+            return True
+        return time.monotonic() - self._oldest_pending_at >= self._flush_interval
+
+    def _run(self):
+        retry_delay = self._flush_interval
+        attempts = 0
+        failing_head = None
+        while True:
+            with self._cond:
+                while not self._due():
+                    if self._closed:
+                        return
+                    timeout = None
+                    if self._pending:
+                        timeout = self._flush_interval - (time.monotonic() - self._oldest_pending_at)
+                    self._cond.wait(timeout)
+                batch = self._pending[:self._max_batch]
+                if self._batch_key:
+                    # A batch is retried as a whole, so it must not span destinations that could half-succeed.
+                    key = self._batch_key(batch[0][1])
+                    batch = list(itertools.takewhile(lambda entry: self._batch_key(entry[1]) == key, batch))
+                self._inflight_upto = batch[-1][0]
+
+            try:
+                self._flush_func([row for _, row in batch])
+            except Exception as e:
+                if batch[0][0] != failing_head:
+                    failing_head = batch[0][0]
+                    attempts = 0
+                # Outages and quota errors are waited out however long they last; only a batch the sheet itself
+                # keeps rejecting is moved aside, since it would otherwise block every row queued behind it.
+                if self._is_permanent and self._is_permanent(e):
+                    attempts += 1
+                if self._max_attempts and attempts >= self._max_attempts:
+                    self._dead_letter(batch, attempts, e)
+                    retry_delay = self._flush_interval
+                    continue
+
+                logger.error(f"Write-behind flush of {len(batch)} rows failed: {e}")
+                retry_at = time.monotonic() + retry_delay
+                with self._cond:
+                    self._inflight_upto = 0
+                    self._cond.notify_all()
+                    while not self._closed and time.monotonic() < retry_at:
+                        self._cond.wait(retry_at - time.monotonic())
+                    if self._closed:
+                        return
+                retry_delay = min(retry_delay * 2, 60)
+                continue
+
+            retry_delay = self._flush_interval
+            with self._cond:
+                self._write_journal({"flushed": batch[-1][0]})
+                self._pending = [entry for entry in self._pending if entry[0] > self._inflight_upto]
+                self._oldest_pending_at = time.monotonic() if self._pending else None
+                if not self._pending:
+                    self._journal.truncate(0)
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._pending:
+                self._oldest_pending_at = time.monotonic() - self._flush_interval
+            self._cond.notify_all()
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=30)
+        self._journal.close()